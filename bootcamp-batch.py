@@ -0,0 +1,146 @@
+from gh import client, gh, index, setup_logging, trace
+import atexit
+import importlib
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Set up several bootcamp issues in one process. The cohorts share one admin
+# client, so the connection pool, id cache and rate limit scheduler are shared
+# and the enterprise id is looked up once. Their orgs are provisioned together
+# and each issue still gets its own labels, journal, manifest and results.
+#
+#   python bootcamp-batch.py <working repo> [issue number ...] [--resume]
+#
+# Batch requests carry the batch label (bootcamp::batch) next to the new one,
+# which keeps the per-issue setup workflow off them. Without issue numbers,
+# every open issue with both labels is set up; issues passed by number must
+# have them too.
+setup = importlib.import_module("bootcamp-setup")
+
+
+# Org names a cohort plans to create
+def planned_org_names(cohort):
+    return {org["org_name"].lower() for org in cohort["plan"]["orgs"]}
+
+
+# Prepare one issue of the batch. Returns the cohort, or None if the issue
+# isn't a pending batch request or couldn't be prepared; one bad issue
+# doesn't stop the others.
+def prepare_issue(admin_client, issue, config, org_index, resume):
+    try:
+        details = issue.get()
+        labels = [label["name"] for label in details["labels"]]
+        wanted = [config["labels"]["new"], config["labels"]["batch"]]
+        if details["state"] != "open" or any(label not in labels for label in wanted):
+            logging.error(
+                f"Issue {issue.issue_num} is not an open issue labeled "
+                f"{' and '.join(wanted)}, leaving it alone"
+            )
+            return None
+        return setup.prepare_cohort(admin_client, issue, config, org_index, resume)
+    except Exception as e:
+        logging.error(f"Could not prepare issue {issue.issue_num}: {e}")
+        return None
+
+
+def main():
+    setup_logging()
+    working_repo = sys.argv[1]
+    resume = "--resume" in sys.argv[2:]
+    issue_nums = [arg for arg in sys.argv[2:] if not arg.startswith("--")]
+
+    logging.info("Starting bootcamp batch setup")
+    logging.info(f"Working repo: {working_repo}")
+
+    config = setup.get_config("config.yml")
+    for key, value in config.items():
+        logging.info(f"{key}: {value}")
+
+    # Every request is traced; the summary goes to the Actions job summary
+    tracer = trace.Tracer(os.path.join(config["state-path"], "trace-batch.jsonl"))
+    atexit.register(tracer.finish)
+
+    admin_client = setup.get_admin_client(config, os.environ.get("ADMIN_TOKEN"), tracer)
+    issue_ops_client = client.Client(os.environ.get("GITHUB_TOKEN"), working_repo)
+    issue_ops_client.add_hook(tracer)
+
+    if not issue_nums:
+        issue_nums = [
+            str(issue["number"])
+            for issue in issue_ops_client.issue.get_all(
+                labels=f"{config['labels']['new']},{config['labels']['batch']}"
+            )
+        ]
+    if not issue_nums:
+        logging.info("No bootcamp issues to set up")
+        return
+    logging.info(f"Issues: {issue_nums}")
+
+    # Without the enterprise nothing can be created; leave the issues as they
+    # are so a later run picks them up
+    try:
+        enterprise_id = admin_client.enterprise.get_id(config["enterprise"])
+    except Exception as e:
+        logging.error(f"Could not get the enterprise id: {e}")
+        sys.exit(1)
+
+    org_index = index.OrgIndex(config["index-path"])
+
+    # Issues are read and validated in parallel, a few at a time; every
+    # problem is reported before any org is created
+    issues = [gh.Issue(issue_ops_client, working_repo, num) for num in issue_nums]
+    with ThreadPoolExecutor(
+        max_workers=min(len(issues), config["max-workers"])
+    ) as pool:
+        prepared = list(
+            pool.map(
+                lambda issue: prepare_issue(
+                    admin_client, issue, config, org_index, resume
+                ),
+                issues,
+            )
+        )
+
+    cohorts = []
+    org_names = {}
+    failed = 0
+    for issue, cohort in zip(issues, prepared):
+        issue_num = issue.issue_num
+        if cohort is None:
+            failed += 1
+            continue
+
+        # Two cohorts on the same date with a shared handle would end up in
+        # the same org; set up the first and fail the other
+        clashes = planned_org_names(cohort) & set(org_names)
+        if clashes:
+            problems = [
+                f"Org `{clash}` is also planned by issue #{org_names[clash]}"
+                for clash in sorted(clashes)
+            ]
+            for problem in problems:
+                logging.error(f"Issue {issue_num}: {problem}")
+            setup.fail_issue(issue, config, problems)
+            failed += 1
+            continue
+        for org_name in planned_org_names(cohort):
+            org_names[org_name] = issue_num
+        cohorts.append(cohort)
+
+    if cohorts:
+        setup.provision_enironments(admin_client, cohorts, config, enterprise_id)
+
+    for cohort in cohorts:
+        if not setup.report_cohort(cohort, config, org_index):
+            failed += 1
+
+    if failed > 0:
+        logging.error(f"{failed} of {len(issue_nums)} bootcamps had errors")
+        sys.exit(1)
+    logging.info(f"Set up {len(cohorts)} bootcamps")
+
+
+if __name__ == "__main__":
+    main()
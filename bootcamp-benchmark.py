@@ -0,0 +1,263 @@
+from gh import setup_logging, simulator
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Benchmarks setup and teardown end to end against the local API simulator for
+# a range of cohort sizes and repos-to-fork lists. Each run gets a fresh
+# simulator, cache and journal, and runs the real scripts as subprocesses.
+#
+#   python bootcamp-benchmark.py --cohorts 10,100,500 --repos 1,5 --json out.json
+#
+# --startup instead checks how long importing the package and the scripts
+# takes in a fresh interpreter. Every import must stay within the budget and
+# must not load a heavy dependency; those load when a client or config is
+# first needed.
+#
+#   python bootcamp-benchmark.py --startup --startup-budget 50
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+WORKING_REPO = "github-adv-sec/adv-sec"
+ISSUE_NUM = 1
+
+STARTUP_MODULES = [
+    "gh",
+    "gh.client",
+    "bootcamp-setup",
+    "bootcamp-teardown",
+    "bootcamp-batch",
+]
+HEAVY_MODULES = ["requests", "urllib3", "yaml", "httpx"]
+STARTUP_SCRIPT = """
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+print(json.dumps({
+    "seconds": time.perf_counter() - start,
+    "heavy": [module for module in sys.argv[2:] if module in sys.modules],
+}))
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark bootcamp provisioning")
+    parser.add_argument("--cohorts", default="10,100,500")
+    parser.add_argument("--repos", default="1,5", help="repos-to-fork list sizes")
+    parser.add_argument("--strategy", choices=["fork", "template"], default="fork")
+    parser.add_argument("--max-workers", type=int, default=None)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--fork-delay", type=float, default=1.0)
+    parser.add_argument("--org-delay", type=float, default=0.5)
+    parser.add_argument("--delete-delay", type=float, default=0.5)
+    # Enterprise Cloud accounts get 15,000 requests an hour
+    parser.add_argument("--rate-limit", type=int, default=15000)
+    parser.add_argument(
+        "--content-limits",
+        default="",
+        help="client secondary limit windows as count/seconds,... (default: none)",
+    )
+    parser.add_argument("--content-per-minute", type=int, default=None)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument(
+        "--startup", action="store_true", help="check import times instead"
+    )
+    parser.add_argument(
+        "--startup-budget", type=float, default=50, help="milliseconds per import"
+    )
+    parser.add_argument("--startup-runs", type=int, default=5)
+    return parser.parse_args()
+
+
+# The repo's config with the benchmark's settings and repos-to-fork list
+def write_config(path, args, repo_count):
+    import yaml
+
+    with open(os.path.join(ROOT, "config.yml"), "r") as stream:
+        config = yaml.safe_load(stream)
+
+    repos = config["bootcamp-setup"]["repos-to-fork"][:repo_count]
+    repos += [
+        f"ghas-bootcamp-resources/benchmark-{i}" for i in range(repo_count - len(repos))
+    ]
+    content_limits = [
+        [int(part) for part in window.split("/")]
+        for window in args.content_limits.split(",")
+        if window
+    ]
+    for section in ("bootcamp-setup", "bootcamp-teardown"):
+        config[section]["content-limits"] = content_limits
+        if args.max_workers is not None:
+            config[section]["max-workers"] = args.max_workers
+    config["bootcamp-setup"]["repos-to-fork"] = [
+        {"repo": repo, "strategy": args.strategy} for repo in repos
+    ]
+
+    with open(os.path.join(path, "config.yml"), "w") as stream:
+        yaml.safe_dump(config, stream)
+
+
+def issue_body(cohort):
+    attendees = ", ".join(f"attendee{i:04d}" for i in range(cohort))
+    return (
+        "### Bootcamp Date\n\n2026-01-01\n\n"
+        f"### Attendees\n\n{attendees}\n\n"
+        "### Facilitators\n\nfacilitator0\n"
+    )
+
+
+# Runs one of the scripts and returns (exit code, seconds, peak RSS in MB)
+def run_script(script, path, url, args):
+    env = dict(
+        os.environ,
+        GITHUB_API_URL=url,
+        GITHUB_GRAPHQL_URL=f"{url}/graphql",
+        GITHUB_TOKEN="benchmark-issue-token",
+        ADMIN_TOKEN="benchmark-admin-token",
+        PYTHONPATH=ROOT,
+    )
+    with open(os.path.join(path, f"{script}.log"), "w") as log:
+        start = time.time()
+        process = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, script), *args],
+            cwd=path,
+            env=env,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+        # wait4 reports the usage of this child alone, not every child so far
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        elapsed = time.time() - start
+    return process.returncode, elapsed, usage.ru_maxrss / 1024
+
+
+def measure(sim, script, path, url, args):
+    sim.reset_stats()
+    code, elapsed, peak = run_script(script, path, url, args)
+    stats = sim.snapshot()
+    return {
+        "exit_code": code,
+        "seconds": round(elapsed, 2),
+        "requests": stats["requests"],
+        "requests_per_second": round(stats["requests"] / elapsed, 1),
+        "peak_rss_mb": round(peak, 1),
+        "first_invite_seconds": (
+            round(stats["first_invite"], 2)
+            if stats["first_invite"] is not None
+            else None
+        ),
+        "max_in_flight": stats["max_in_flight"],
+        "by_status": stats["by_status"],
+    }
+
+
+def run_benchmark(args, cohort, repo_count):
+    sim = simulator.Simulator(
+        latency=args.latency,
+        fork_delay=args.fork_delay,
+        org_delay=args.org_delay,
+        delete_delay=args.delete_delay,
+        rate_limit=args.rate_limit,
+        content_per_minute=args.content_per_minute,
+        error_rate=args.error_rate,
+    )
+    sim.add_issue(WORKING_REPO, ISSUE_NUM, issue_body(cohort), ["bootcamp::new"])
+    url = sim.start()
+    try:
+        with tempfile.TemporaryDirectory() as path:
+            write_config(path, args, repo_count)
+            setup = measure(
+                sim, "bootcamp-setup.py", path, url, [WORKING_REPO, str(ISSUE_NUM)]
+            )
+            teardown = measure(
+                sim, "bootcamp-teardown.py", path, url, [WORKING_REPO, str(ISSUE_NUM)]
+            )
+    finally:
+        sim.stop()
+    return {"cohort": cohort, "repos": repo_count, "setup": setup, "teardown": teardown}
+
+
+# Best of a few imports of a module, each in a fresh interpreter
+def measure_startup(module, runs):
+    best = None
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT, module, *HEAVY_MODULES],
+            cwd=ROOT,
+            env=dict(os.environ, PYTHONPATH=ROOT),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        result = json.loads(output)
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+    return {
+        "module": module,
+        "milliseconds": round(best["seconds"] * 1000, 1),
+        "heavy_modules": best["heavy"],
+    }
+
+
+# Prints the import times and returns False if any is over budget
+def check_startup(results, budget):
+    ok = True
+    print(f"{'module':<20} {'ms':>7}  heavy modules loaded")
+    for result in results:
+        over = result["milliseconds"] > budget or result["heavy_modules"]
+        ok = ok and not over
+        print(
+            f"{result['module']:<20} {result['milliseconds']:>7.1f}  "
+            f"{', '.join(result['heavy_modules']) or '-'}{'  OVER BUDGET' if over else ''}"
+        )
+    return ok
+
+
+def print_results(results):
+    header = f"{'cohort':>6} {'repos':>5} {'phase':<8} {'exit':>4} {'seconds':>8} {'requests':>8} {'req/s':>7} {'peak MB':>8} {'1st invite':>10}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        for phase in ("setup", "teardown"):
+            row = result[phase]
+            first_invite = row["first_invite_seconds"]
+            print(
+                f"{result['cohort']:>6} {result['repos']:>5} {phase:<8} {row['exit_code']:>4} "
+                f"{row['seconds']:>8.1f} {row['requests']:>8} {row['requests_per_second']:>7.1f} "
+                f"{row['peak_rss_mb']:>8.1f} {first_invite if first_invite is not None else '-':>10}"
+            )
+
+
+def main():
+    setup_logging()
+    args = parse_args()
+    if args.startup:
+        results = [
+            measure_startup(module, args.startup_runs) for module in STARTUP_MODULES
+        ]
+        ok = check_startup(results, args.startup_budget)
+        if args.json:
+            with open(args.json, "w") as stream:
+                json.dump(results, stream, indent=2)
+        sys.exit(0 if ok else 1)
+
+    results = []
+    for cohort in [int(size) for size in args.cohorts.split(",")]:
+        for repo_count in [int(count) for count in args.repos.split(",")]:
+            logging.info(f"Benchmarking {cohort} attendees with {repo_count} repos")
+            results.append(run_benchmark(args, cohort, repo_count))
+
+    print_results(results)
+    if args.json:
+        with open(args.json, "w") as stream:
+            json.dump(results, stream, indent=2)
+
+
+if __name__ == "__main__":
+    main()
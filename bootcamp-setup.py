@@ -1,68 +1,63 @@
-from gh import client, comments
+from gh import (
+    cache,
+    client,
+    comments,
+    index,
+    journal,
+    naming,
+    setup_logging,
+    status,
+    trace,
+    validate,
+)
+import atexit
 import sys
 import os
 import logging
-import yaml
-import time
+import json
+import itertools
+from concurrent.futures import ThreadPoolExecutor
 
-# Get Arguments
-working_repo = sys.argv[1]
-issue_num = sys.argv[2]
 
-# Get Environment Variables
-github_token = os.environ.get("GITHUB_TOKEN")
-admin_token = os.environ.get("ADMIN_TOKEN")
-
-# Setup clients
-issue_ops_client = client.Client(github_token, working_repo, issue_num)
-admin_client = client.Client(admin_token)
-
-logging.info("Starting bootcamp setup")
-logging.info(f"Working repo: {working_repo}")
-logging.info(f"Issue number: {issue_num}")
-
-
-# Read config file
+# Read config file. Every problem with it is logged before exiting, so one
+# run is enough to find them all.
 def get_config(config_file):
+    import yaml
+
     with open(config_file, "r") as stream:
         try:
-            return yaml.safe_load(stream)["bootcamp-setup"]
+            config = yaml.safe_load(stream)["bootcamp-setup"]
         except yaml.YAMLError as e:
             logging.error(e)
             sys.exit(1)
-
-
-# Get bootcamp date, attendees, and facilitators from issue body
-def extract_issue_fields():
-    try:
-        issue = issue_ops_client.issue.get()
-        issue_body = issue["body"]
-        lines = issue_body.split("\n")
-    except Exception as e:
-        raise e
-
-    bootcamp_date = None
-    attendee_handles = None
-    facilitator_handles = None
-
-    for i, line in enumerate(lines):
-        if line == "### Bootcamp Date":
-            bootcamp_date = lines[i + 2].strip()
-        elif line == "### Attendees":
-            attendee_handles = [
-                attendee.strip() for attendee in lines[i + 2].split(",")
-            ]
-        elif line == "### Facilitators":
-            facilitator_handles = [
-                facilitator.strip() for facilitator in lines[i + 2].split(",")
-            ]
-
-    if not bootcamp_date:
-        raise ValueError("Bootcamp date cannot be empty")
-    if not attendee_handles:
-        raise ValueError("Attendees cannot be empty")
-    if not facilitator_handles:
-        raise ValueError("Facilitators cannot be empty")
+    problems = validate.check_setup_config(config)
+    for problem in problems:
+        logging.error(problem)
+    if problems:
+        sys.exit(1)
+    return config
+
+
+# Admin client for provisioning, shared by every cohort in a run: connections
+# for the org, fork and invite pools, the id cache and the configured limits
+def get_admin_client(config, admin_token, tracer):
+    admin_client = client.Client(admin_token)
+    admin_client.set_pool_size(3 * config["max-workers"])
+    admin_client.cache = cache.Cache(config["cache-path"], config["cache-ttl"])
+    admin_client.add_hook(tracer)
+    # Secondary limits default to github.com's; GHES or the simulator may differ
+    if "content-limits" in config:
+        admin_client.scheduler.set_content_windows(config["content-limits"])
+    return admin_client
+
+
+# Get bootcamp date, attendees, and facilitators from the issue form. Handles
+# are normalised and deduplicated; validate_issue_fields checks them.
+def extract_issue_fields(issue):
+    fields = validate.parse_form(issue.get()["body"])
+    bootcamp_date = fields.get("Bootcamp Date", "")
+    attendee_handles = validate.parse_handles(fields.get("Attendees"))
+    facilitator_handles = validate.parse_handles(fields.get("Facilitators"))
 
     logging.info(f"Bootcamp date: {bootcamp_date}")
     logging.info(f"Attendees: {attendee_handles}")
@@ -71,165 +66,599 @@ def extract_issue_fields():
     return bootcamp_date, attendee_handles, facilitator_handles
 
 
+# Check everything a bootcamp request needs before anything is created: the
+# date, the handles and that every handle is a user. All handles (and the
+# billing admin) are resolved in one batched lookup. Returns the user ids by
+# lowercase handle and the problems.
+@trace.stage("validate")
+def validate_issue_fields(
+    admin_client, config, bootcamp_date, attendee_handles, facilitator_handles
+):
+    problems = (
+        validate.check_date(bootcamp_date)
+        + validate.check_handles(attendee_handles, "Attendees")
+        + validate.check_handles(facilitator_handles, "Facilitators")
+    )
+
+    # Someone can be both attendee and facilitator; they get one org
+    handles = {}
+    for handle in attendee_handles + facilitator_handles:
+        if validate.valid_login(handle):
+            handles.setdefault(handle.lower(), handle)
+    lookups = dict(handles)
+    lookups.setdefault(config["billing-admin"].lower(), config["billing-admin"])
+    found, not_found = admin_client.user.get_ids(list(lookups.values()))
+    ids = {handle.lower(): id for handle, id in found.items()}
+    for handle in not_found:
+        if handle.lower() in handles:
+            problems.append(f"`{handle}` is not a GitHub user")
+        else:
+            problems.append(f"Billing admin `{handle}` is not a GitHub user")
+
+    return ids, problems
+
+
+# Org names for every handle, checked against GitHub in batches so no create
+# is attempted for a name that is already taken. Names of orgs deleted in the
+# last 90 days are still held by GitHub and are skipped too, as are the live
+# orgs of other bootcamps. An existing org is only reused if this issue
+# created it: its journal recorded it (reusable) or the index has it.
+@trace.stage("naming")
+def plan_org_names(
+    admin_client, config, issue_num, bootcamp_date, handles, org_index, reusable=()
+):
+    reusable = list(reusable) + (org_index.org_names(issue_num) or [])
+    org_names = naming.plan(
+        handles,
+        config["org-prefix"],
+        bootcamp_date,
+        lambda names: admin_client.org.get_taken(names, reusable=reusable),
+        org_index.recently_deleted() + org_index.claimed(issue_num),
+    )
+    for handle in handles:
+        logging.info(f"Org name for {handle}: {org_names[handle.lower()]}")
+    return org_names
+
+
 # Attendee state factory - builds a list of attendees with their initial state
-def build_attendees(handles):
+# from the ids validate_issue_fields resolved
+def build_attendees(handles, ids):
     attendees = []
     for handle in handles:
         attendee = {
             "handle": handle,
-            "id": None,
+            "id": ids.get(handle.lower()),
             "invited": False,
             "org_id": None,
             "org_name": None,
             "fork_errors": [],
         }
-        try:
-            attendee["id"] = admin_client.user.get_id(handle)
-        except Exception as e:
-            raise e
-
         attendees.append(attendee)
 
     return attendees
 
 
-# Create orgs and fork repos
-def provision_enironments(
-    attendee_state, config, enterprise_id, bootcamp_date, facilitator_state
+# Work out every org, its admins and its forks up front so nothing is done
+# twice: one admin list for all orgs, one org per handle even if it appears
+# as both attendee and facilitator, and no visibility change for .github.
+def plan_environments(attendee_state, facilitator_state, config, org_names):
+    admins = {}
+    for facilitator in facilitator_state:
+        if facilitator["id"] is not None:
+            admins.setdefault(facilitator["handle"].lower(), facilitator["handle"])
+    admins.setdefault(config["billing-admin"].lower(), config["billing-admin"])
+
+    forks = [
+        dict(entry, private=entry["repo"].split("/")[1] != ".github")
+        for entry in get_repo_entries(config)
+    ]
+
+    orgs = {}
+    for role, state in [
+        ("attendee", attendee_state),
+        ("facilitator", facilitator_state),
+    ]:
+        for attendee in state:
+            # So the results can tell admins apart from failed invites
+            attendee["admin"] = attendee["handle"].lower() in admins
+            if attendee["id"] is None:
+                logging.error(f"Skipping {attendee['handle']}: user does not exist")
+                continue
+            handle = attendee["handle"].lower()
+            if handle not in orgs:
+                orgs[handle] = {
+                    # An org created by an interrupted run keeps its name
+                    "org_name": attendee["org_name"] or org_names[handle],
+                    "members": [],
+                    "roles": [],
+                    # Admins already have access to every org, so they need no invite
+                    "invite": False,
+                }
+            orgs[handle]["members"].append(attendee)
+            orgs[handle]["roles"].append(role)
+            if role == "attendee" and handle not in admins:
+                orgs[handle]["invite"] = True
+
+    return {
+        "admins": list(admins.values()),
+        "forks": forks,
+        "orgs": list(orgs.values()),
+    }
+
+
+# Entries in repos-to-fork are "owner/repo" to fork the repo, or a mapping
+# with a strategy: {"repo": "owner/repo", "strategy": "template"} creates the
+# repo from a template repository instead, private from the start.
+def get_repo_entries(config):
+    entries = {}
+    for entry in config["repos-to-fork"]:
+        if isinstance(entry, str):
+            entry = {"repo": entry}
+        strategy = entry.get("strategy", "fork")
+        if strategy not in validate.REPO_STRATEGIES:
+            raise ValueError(f"Unknown strategy for {entry['repo']}: {strategy}")
+        entries.setdefault(entry["repo"], {"repo": entry["repo"], "strategy": strategy})
+    return list(entries.values())
+
+
+# Print the operations a plan would perform, for --dry-run
+def print_plan(plan, config, enterprise_id):
+    visibility_changes = sum(
+        1 for fork in plan["forks"] if fork["private"] and fork["strategy"] == "fork"
+    )
+    invites = sum(1 for org in plan["orgs"] if org["invite"])
+    print(f"Enterprise: {config['enterprise']} ({enterprise_id})")
+    print(f"Admins: {', '.join(plan['admins'])}")
+    for org in plan["orgs"]:
+        handles = ", ".join(member["handle"] for member in org["members"])
+        print(f"\nOrg {org['org_name']} ({handles}; {', '.join(org['roles'])})")
+        print("  create org")
+        for fork in plan["forks"]:
+            target = f"{org['org_name']}/{fork['repo'].split('/')[1]}"
+            action = "fork" if fork["strategy"] == "fork" else "create from template"
+            if fork["private"]:
+                print(f"  {action} {fork['repo']} -> {target} (private)")
+            else:
+                print(f"  {action} {fork['repo']} -> {target}")
+        if org["invite"]:
+            print(f"  invite {org['members'][0]['handle']}")
+
+    orgs = len(plan["orgs"])
+    forks = orgs * len(plan["forks"])
+    # Every org and repo is created with one call. Only orgs that get an
+    # invite are polled for readiness (then invited), and only forks that are
+    # made private are polled (then hidden); anything else isn't waited on.
+    calls = orgs + forks + 2 * invites + 2 * orgs * visibility_changes
+    print(
+        f"\n{orgs} orgs, {forks} repos, {orgs * visibility_changes} visibility changes, "
+        f"{invites} invites, at least {calls} API calls"
+    )
+
+
+# Fork a single repo into an attendee org
+@trace.stage("fork")
+def fork_repo(admin_client, attendee, fork, timeout, progress):
+    org_name = attendee["org_name"]
+    repo = fork["repo"]
+    # Template copies are created private, so there is nothing to wait for
+    if fork["strategy"] == "template":
+        if not progress.done("generated", attendee["handle"], repo):
+            admin_client.repo.create_from_template(repo, org_name, fork["private"])
+            progress.record("generated", attendee["handle"], repo)
+        return
+    if not progress.done("forked", attendee["handle"], repo):
+        admin_client.repo.fork(repo, org_name)
+        progress.record("forked", attendee["handle"], repo)
+    # Make forked repos private, except for .github
+    if fork["private"]:
+        if progress.done("visibility_set", attendee["handle"], repo):
+            return
+        forked_repo = org_name + "/" + repo.split("/")[1]
+        # Wait for the fork to exist to avoid a race between creating the repo and marking it private
+        admin_client.repo.wait_until_ready(forked_repo, timeout)
+        admin_client.repo.visibility(forked_repo, "private")
+        progress.record("visibility_set", attendee["handle"], repo)
+
+
+# Create the org for a single attendee
+@trace.stage("create_org")
+def create_org(
+    admin_client, attendee, org_name, admins, config, enterprise_id, progress
 ):
-    facilitator_handles = [facilitator["handle"] for facilitator in facilitator_state]
-    facilitator_handles.append(config["billing-admin"])
+    try:
+        org_id, org_name = admin_client.org.create(
+            enterprise_id,
+            org_name,
+            admins,
+            f"{config['billing-admin']}@spektrasystems.com",
+        )
+        attendee.update({"org_id": org_id, "org_name": org_name})
+        progress.record(
+            "org_created", attendee["handle"], org_id=org_id, org_name=org_name
+        )
+    except Exception as e:
+        logging.error(f"Could not create org {org_name} for {attendee['handle']}: {e}")
 
-    # Create orgs and fork repos
-    for attendee in attendee_state:
-        try:
-            # If an org_name is too long because the attendee handle is long, only get the first 39 characters
-            org_name = (
-                config["org-prefix"] + "-" + bootcamp_date + "-" + attendee["handle"]
-            )
-            if len(org_name) > 39:
-                org_name = org_name[0:38]
-
-            org_id, org_name = admin_client.org.create(
-                
-                org_name,
-                facilitator_handles,
-                f"{config['billing-admin']}@spektrasystems.com",
+
+# Invite an attendee to their org as soon as the org is ready
+@trace.stage("invite")
+def invite_attendee(admin_client, attendee, timeout, progress):
+    if attendee["invited"]:
+        return
+    try:
+        admin_client.org.wait_until_ready(attendee["org_name"], timeout)
+        admin_client.org.invite_member(attendee["id"], attendee["org_name"])
+        attendee["invited"] = True
+        progress.record("invited", attendee["handle"])
+    except Exception as e:
+        logging.error(
+            f"Could not invite {attendee['handle']} to {attendee['org_name']}: {e}"
+        )
+
+
+# Create a single planned org and fork repos into it. The invite, if any, is
+# sent alongside the forks.
+def provision_org(
+    admin_client, org, plan, config, enterprise_id, fork_pool, invite_pool, progress
+):
+    attendee = org["members"][0]
+
+    # An org created by an earlier, interrupted run is kept as is
+    if not attendee["org_name"]:
+        create_org(
+            admin_client,
+            attendee,
+            org["org_name"],
+            plan["admins"],
+            config,
+            enterprise_id,
+            progress,
+        )
+
+    # Without an org there is nothing to fork into
+    if not attendee["org_name"]:
+        attendee["fork_errors"].extend(fork["repo"] for fork in plan["forks"])
+    else:
+        if org["invite"]:
+            invite = invite_pool.submit(
+                invite_attendee,
+                admin_client,
+                attendee,
+                config["readiness-timeout"],
+                progress,
             )
-            attendee.update({"org_id": org_id, "org_name": org_name})
-        except Exception:
-            pass
 
-        for repo in config["repos-to-fork"]:
+        # Forks for the same org run in parallel; errors are collected in config order
+        forks = [
+            (
+                fork["repo"],
+                fork_pool.submit(
+                    fork_repo,
+                    admin_client,
+                    attendee,
+                    fork,
+                    config["readiness-timeout"],
+                    progress,
+                ),
+            )
+            for fork in plan["forks"]
+        ]
+        for repo, future in forks:
             try:
-                admin_client.repo.fork(repo, attendee["org_name"])
-                # Make forked repos private, except for .github
-                if repo.split("/")[1] != ".github":
-                    forked_repo = attendee["org_name"] + "/" + repo.split("/")[1]
-                    # Adding a sleep to avoid race condition when creating a repo and marking it private
-                    time.sleep(15)
-                    admin_client.repo.visibility(forked_repo, "private")
+                future.result()
             except Exception:
                 attendee["fork_errors"].append(repo)
                 pass
 
-    return attendee_state
+        if org["invite"]:
+            invite.result()
+
+    # Facilitators who are also attendees share the one org
+    for member in org["members"][1:]:
+        member.update(
+            {
+                "org_id": attendee["org_id"],
+                "org_name": attendee["org_name"],
+                "invited": attendee["invited"],
+                "fork_errors": list(attendee["fork_errors"]),
+            }
+        )
 
+    return org
 
-def main():
-    # Get config
-    config = get_config("config.yml")
-    for key, value in config.items():
-        logging.info(f"{key}: {value}")
 
+# Create orgs, fork repos and invite attendees for every org in the plans of
+# one or more cohorts. Cohorts share the pools and their orgs are taken in
+# turn, so every cohort gets its first invites out early.
+def provision_enironments(admin_client, cohorts, config, enterprise_id):
+    jobs = [
+        job
+        for jobs in itertools.zip_longest(
+            *[[(cohort, org) for org in cohort["plan"]["orgs"]] for cohort in cohorts]
+        )
+        for job in jobs
+        if job is not None
+    ]
+
+    # Each issue gets a status comment that is kept up to date as steps finish
+    for cohort in cohorts:
+        cohort["status"].start(cohort["progress"].entries)
+        cohort["progress"].add_listener(cohort["status"].record)
+
+    # Orgs, forks and invites get separate pools so an org waiting on its
+    # forks and invite can never starve those workers
+    max_workers = config["max-workers"]
+    with ThreadPoolExecutor(max_workers=max_workers) as fork_pool:
+        with ThreadPoolExecutor(max_workers=max_workers) as invite_pool:
+            with ThreadPoolExecutor(max_workers=max_workers) as org_pool:
+                futures = []
+                for cohort, org in jobs:
+                    future = org_pool.submit(
+                        provision_org,
+                        admin_client,
+                        org,
+                        cohort["plan"],
+                        config,
+                        enterprise_id,
+                        fork_pool,
+                        invite_pool,
+                        cohort["progress"],
+                    )
+                    cohort["status"].watch(future, org)
+                    futures.append(future)
+                for future in futures:
+                    future.result()
+
+    for cohort in cohorts:
+        cohort["status"].close()
+    return cohorts
+
+
+# Manifest of everything setup created, so teardown doesn't have to scrape tables
+def build_manifest(cohort, config):
+    orgs = []
+    for role, state in [
+        ("attendee", cohort["attendees"]),
+        ("facilitator", cohort["facilitators"]),
+    ]:
+        for attendee in state:
+            if not attendee["org_name"]:
+                continue
+            repos = [
+                attendee["org_name"] + "/" + entry["repo"].split("/")[1]
+                for entry in get_repo_entries(config)
+                if entry["repo"] not in attendee["fork_errors"]
+            ]
+            orgs.append(
+                {
+                    "org_name": attendee["org_name"],
+                    "org_id": attendee["org_id"],
+                    "handle": attendee["handle"],
+                    "user_id": attendee["id"],
+                    "role": role,
+                    "repos": repos,
+                }
+            )
+    return {
+        "version": comments.MANIFEST_VERSION,
+        "issue": int(cohort["issue"].issue_num),
+        "bootcamp_date": cohort["bootcamp_date"],
+        "org_prefix": config["org-prefix"],
+        "orgs": orgs,
+    }
+
+
+# Keep a copy of the manifest next to the journal; the workflow uploads it as an artifact
+def save_manifest(manifest, config):
+    path = os.path.join(config["state-path"], f"manifest-{manifest['issue']}.json")
+    with open(path, "w") as stream:
+        json.dump(manifest, stream, indent=2)
+    logging.info(f"Wrote manifest: {path}")
+
+
+# Mark the issue as errored, comment (with the problems found, if any) and close it
+def fail_issue(issue, config, problems=()):
+    issue.apply_label(config["labels"]["error"])
+    issue.remove_label(config["labels"]["working"])
+    issue.add_comment(comments.errored + comments.problems_to_markdown(problems))
+    issue.close()
+
+
+# Read an issue and plan its bootcamp. Returns the cohort (issue, attendees,
+# plan and journal) or None if the issue can't be set up, in which case it has
+# been marked as errored. A dry run only reads and leaves the journal alone.
+def prepare_cohort(admin_client, issue, config, org_index, resume=False, dry_run=False):
     # apply starting label
-    issue_ops_client.issue.apply_label(config["labels"]["working"])
-    issue_ops_client.issue.remove_label(config["labels"]["new"])
+    if not dry_run:
+        issue.apply_label(config["labels"]["working"])
+        issue.remove_label(config["labels"]["new"])
 
-    # Get info from issue
-    try:
-        bootcamp_date, attendee_handles, facilitator_handles = extract_issue_fields()
-    except Exception as e:
-        issue_ops_client.issue.apply_label(config["labels"]["error"])
-        issue_ops_client.issue.remove_label(config["labels"]["working"])
-        issue_ops_client.issue.add_comment(comments.errored)
-        issue_ops_client.issue.close()
-        sys.exit(1)
-
-    # Get enterprise id
+    # Get info from issue and check all of it before anything is created
     try:
-        enterprise_id = admin_client.enterprise.get_id(config["enterprise"])
+        bootcamp_date, attendee_handles, facilitator_handles = extract_issue_fields(
+            issue
+        )
+        ids, problems = validate_issue_fields(
+            admin_client, config, bootcamp_date, attendee_handles, facilitator_handles
+        )
     except Exception as e:
-        issue_ops_client.issue.apply_label(config["labels"]["error"])
-        issue_ops_client.issue.remove_label(config["labels"]["working"])
-        issue_ops_client.issue.add_comment(comments.errored)
-        issue_ops_client.issue.close()
-        sys.exit(1)
-
-    # Build attendee list
+        logging.error(f"Could not prepare issue {issue.issue_num}: {e}")
+        if not dry_run:
+            fail_issue(issue, config)
+        return None
+    if problems:
+        for problem in problems:
+            logging.error(f"Issue {issue.issue_num}: {problem}")
+        if not dry_run:
+            fail_issue(issue, config, problems)
+        return None
+
+    # Build the attendee list, reusing the one from an interrupted run if the
+    # handles still match, then name every org
+    progress = None
     try:
-        attendee_state = build_attendees(attendee_handles)
-        facilitator_state = build_attendees(facilitator_handles)
+        if dry_run:
+            attendee_state = build_attendees(attendee_handles, ids)
+            facilitator_state = build_attendees(facilitator_handles, ids)
+        else:
+            # Every completed step is journaled so an interrupted run can be
+            # resumed, as long as it is still for the same bootcamp
+            progress = journal.Journal(
+                os.path.join(config["state-path"], f"setup-{issue.issue_num}.jsonl"),
+                resume,
+                {
+                    "bootcamp_date": bootcamp_date,
+                    "org_prefix": config["org-prefix"],
+                    "repos": config["repos-to-fork"],
+                },
+            )
+            attendee_state = progress.load_state("attendees", attendee_handles)
+            if attendee_state is None:
+                attendee_state = build_attendees(attendee_handles, ids)
+                progress.save_state("attendees", attendee_state)
+            facilitator_state = progress.load_state("facilitators", facilitator_handles)
+            if facilitator_state is None:
+                facilitator_state = build_attendees(facilitator_handles, ids)
+                progress.save_state("facilitators", facilitator_state)
+
+        handles = {}
+        for handle in attendee_handles + facilitator_handles:
+            handles.setdefault(handle.lower(), handle)
+        org_names = plan_org_names(
+            admin_client,
+            config,
+            issue.issue_num,
+            bootcamp_date,
+            list(handles.values()),
+            org_index,
+            progress.created_orgs() if progress else (),
+        )
     except Exception as e:
-        # TODO: Comment and close issue
-        issue_ops_client.issue.apply_label(config["labels"]["error"])
-        issue_ops_client.issue.remove_label(config["labels"]["working"])
-        issue_ops_client.issue.add_comment(comments.errored)
-        issue_ops_client.issue.close()
-        sys.exit(1)
-
-    # Create bootcamp orgs
-    attendee_state = provision_enironments(
-        attendee_state, config, enterprise_id, bootcamp_date, facilitator_state
-    )
-
-    facilitator_state = provision_enironments(
-        facilitator_state, config, enterprise_id, bootcamp_date, facilitator_state
-    )
-
-    # Wait for orgs to be created
-    wait_time = 30
-    logging.info(f"Waiting {wait_time} seconds for orgs to be created")
-    time.sleep(wait_time)
-
-    # invite attendees to orgs
+        logging.error(f"Could not prepare issue {issue.issue_num}: {e}")
+        if not dry_run:
+            fail_issue(issue, config)
+        return None
+
+    plan = plan_environments(attendee_state, facilitator_state, config, org_names)
+    return {
+        "issue": issue,
+        "bootcamp_date": bootcamp_date,
+        "attendees": attendee_state,
+        "facilitators": facilitator_state,
+        "plan": plan,
+        "progress": progress,
+        "status": status.StatusComment(issue, plan, config["status-interval"]),
+    }
+
+
+# Record what a provisioned cohort got and post the results to its issue.
+# Returns False if anything went wrong.
+def report_cohort(cohort, config, org_index):
+    issue = cohort["issue"]
+    attendee_state = cohort["attendees"]
+    facilitator_state = cohort["facilitators"]
+
+    # Invites went out during provisioning; an org without an invite is an error
     error_count = 0
     for attendee in attendee_state:
-        if attendee["org_name"]:
-            try:
-                admin_client.org.invite_member(attendee["id"], attendee["org_name"])
-                attendee["invited"] = True
-            except Exception:
-                issue_ops_client.issue.apply_label(config["labels"]["error"])
-        else:
+        if not attendee["org_name"]:
             error_count += 1
+        elif not attendee["invited"] and not attendee["admin"]:
+            issue.apply_label(config["labels"]["error"])
+
+    manifest = build_manifest(cohort, config)
+    save_manifest(manifest, config)
+    org_index.add_manifest(manifest)
 
     # Check for provisioning errors
     if error_count > 0:
-        issue_ops_client.issue.apply_label(config["labels"]["error"])
-        issue_ops_client.issue.remove_label(config["labels"]["working"])
+        issue.apply_label(config["labels"]["error"])
+        issue.remove_label(config["labels"]["working"])
         comment = (
             comments.errored
             + "### Attendees\n\n"
             + comments.attendees_to_markdown(attendee_state)
             + "### Facilitators\n\n"
             + comments.attendees_to_markdown(facilitator_state)
+            + comments.manifest_to_markdown(manifest)
         )
-        issue_ops_client.issue.add_comment(comment)
-        issue_ops_client.issue.close()
-        sys.exit(1)
+        issue.add_comment(comment)
+        issue.close()
+        return False
 
     # Update the issue with the results
-    issue_ops_client.issue.apply_label(config["labels"]["done"])
-    issue_ops_client.issue.remove_label(config["labels"]["working"])
+    issue.apply_label(config["labels"]["done"])
+    issue.remove_label(config["labels"]["working"])
     comment = (
         comments.complete
         + "### Attendees\n\n"
         + comments.attendees_to_markdown(attendee_state)
         + "### Facilitators\n\n"
         + comments.attendees_to_markdown(facilitator_state)
+        + comments.manifest_to_markdown(manifest)
+    )
+    issue.add_comment(comment)
+    # A later run for this issue (say after a teardown) checks everything
+    # again instead of trusting these steps
+    cohort["progress"].finish()
+    return True
+
+
+def main():
+    setup_logging()
+
+    # Get Arguments
+    working_repo = sys.argv[1]
+    issue_num = sys.argv[2]
+    # --resume picks up where an interrupted run for the same issue left off
+    resume = "--resume" in sys.argv[3:]
+    # --dry-run prints the planned operations without changing anything
+    dry_run = "--dry-run" in sys.argv[3:]
+
+    logging.info("Starting bootcamp setup")
+    logging.info(f"Working repo: {working_repo}")
+    logging.info(f"Issue number: {issue_num}")
+
+    # Get config
+    config = get_config("config.yml")
+    for key, value in config.items():
+        logging.info(f"{key}: {value}")
+
+    # Every request is traced; the summary goes to the Actions job summary
+    tracer = trace.Tracer(
+        os.path.join(config["state-path"], f"trace-{issue_num}.jsonl")
     )
-    issue_ops_client.issue.add_comment(comment)
+    atexit.register(tracer.finish)
+
+    # Setup clients
+    admin_client = get_admin_client(config, os.environ.get("ADMIN_TOKEN"), tracer)
+    issue_ops_client = client.Client(
+        os.environ.get("GITHUB_TOKEN"), working_repo, issue_num
+    )
+    issue_ops_client.add_hook(tracer)
+    issue = issue_ops_client.issue
+
+    org_index = index.OrgIndex(config["index-path"])
+    cohort = prepare_cohort(admin_client, issue, config, org_index, resume, dry_run)
+    if cohort is None:
+        sys.exit(1)
+
+    # Get enterprise id
+    try:
+        enterprise_id = admin_client.enterprise.get_id(config["enterprise"])
+    except Exception as e:
+        if not dry_run:
+            fail_issue(issue, config)
+        sys.exit(1)
+
+    if dry_run:
+        print_plan(cohort["plan"], config, enterprise_id)
+        return
+
+    # Create bootcamp orgs
+    provision_enironments(admin_client, [cohort], config, enterprise_id)
+    if not report_cohort(cohort, config, org_index):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -1,29 +1,17 @@
-from gh import client, comments
+from gh import cache, client, comments, gh, index, setup_logging, trace
+import atexit
 import sys
 import os
 import logging
-import yaml
 import re
-import time
-
-
-# Get Arguments
-working_repo = sys.argv[1]
-issue_num = sys.argv[2]
-
-# Get Environment Variables
-github_token = os.environ.get("GITHUB_TOKEN")
-admin_token = os.environ.get("ADMIN_TOKEN")
-
-# Setup clients
-admin_client = client.Client(admin_token)
-
-logging.info("Starting bootcamp teardown")
-logging.info(f"Working repo: {working_repo}")
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 
 
 # Read config file
 def get_config(config_file):
+    import yaml
+
     with open(config_file, "r") as stream:
         try:
             return yaml.safe_load(stream)["bootcamp-teardown"]
@@ -32,7 +20,44 @@ def get_config(config_file):
             sys.exit(1)
 
 
+# Logins the setup workflow comments as (REST and GraphQL spell the bot differently)
+BOT_LOGINS = ("github-actions[bot]", "github-actions")
+
+
+# Read the org names from the manifest setup hides in its results comment.
+# Only looks at the last few comments, so it's a single API call. Raises on a
+# manifest version this teardown doesn't know rather than guess what to delete.
+def get_manifest_org_names(issue):
+    for comment in reversed(issue.get_recent_comments()):
+        if (comment["author"] or {}).get("login") not in BOT_LOGINS:
+            continue
+        manifest = comments.parse_manifest(comment["body"])
+        if manifest is None:
+            continue
+        if manifest.get("version") != comments.MANIFEST_VERSION:
+            e = f"Issue {issue.issue_num} has a version {manifest.get('version')} manifest, expected {comments.MANIFEST_VERSION}"
+            logging.error(e)
+            raise Exception(e)
+        return [org["org_name"] for org in manifest["orgs"]]
+    return None
+
+
+# Prefer the local index, then the manifest, and only scrape tables for
+# issues set up before either existed
+@trace.stage("find_orgs")
+def find_org_names(issue, org_index):
+    org_names = org_index.org_names(issue.issue_num)
+    if org_names is not None:
+        return org_names
+    org_names = get_manifest_org_names(issue)
+    if org_names is None:
+        logging.info(f"No manifest on issue {issue.issue_num}, reading comment tables")
+        org_names = get_org_names(issue.get_comments())
+    return org_names
+
+
 # read the org name from the comment.  WARNING: this is fragile.
+# Comments can be any iterable, including the lazy Issue.get_comments stream.
 def get_org_names(json_obj):
     org_names = []
     for comment in json_obj:
@@ -43,13 +68,36 @@ def get_org_names(json_obj):
     return org_names
 
 
-def delete_orgs(org_names):
-    state = {"error_count": 0, "success": [], "fail": []}
-    for org in org_names:
+# Delete a single org and wait until it is really gone, retrying failed attempts
+@trace.stage("delete")
+def delete_org(admin_client, org, config):
+    for attempt in range(config["delete-attempts"]):
         try:
             admin_client.org.delete(org)
+            admin_client.org.wait_until_deleted(org, config["readiness-timeout"])
+            return
+        except Exception:
+            if attempt == config["delete-attempts"] - 1:
+                raise
+            logging.warning(f"Retrying deletion of {org}")
+
+
+# Queue deletions for a set of orgs on the pool
+def submit_deletions(admin_client, pool, org_names, config):
+    # The same org can be listed in more than one comment
+    org_names = list(dict.fromkeys(org_names))
+    return [
+        (org, pool.submit(delete_org, admin_client, org, config)) for org in org_names
+    ]
+
+
+# Wait for queued deletions and tally the results
+def collect_deletions(futures):
+    state = {"error_count": 0, "success": [], "fail": []}
+    for org, future in futures:
+        try:
+            future.result()
             state["success"].append(org)
-            time.sleep(5)
         except:
             state["error_count"] += 1
             state["fail"].append(org)
@@ -57,48 +105,161 @@ def delete_orgs(org_names):
     return state
 
 
+def delete_orgs(admin_client, org_names, config):
+    # Deletes run in parallel; the client paces them against the rate limits
+    with ThreadPoolExecutor(max_workers=config["max-workers"]) as pool:
+        return collect_deletions(
+            submit_deletions(admin_client, pool, org_names, config)
+        )
+
+
+# Comment with the results and close the issue
+@trace.stage("report")
+def report_teardown(issue, state, config):
+    issue.add_comment(
+        comments.teardown_complete
+        + "### Deleted Orgs: \n\n"
+        + "\n".join(state["success"])
+        + "\n\n### Failures: \n\n"
+        + "\n".join(state["fail"])
+    )
+    issue.apply_label(config["labels"]["done"])
+    issue.close()
+
+
+# Lazily yields open bootcamp issues that are older than the configured
+# duration and not on hold
+def expired_issues(issue_ops_client, config, org_index):
+    cutoff = datetime.utcnow() - timedelta(days=config["duration"])
+    issues = issue_ops_client.issue.get_all(config["labels"]["open"])
+    while True:
+        # The stage covers fetching the issues, not what the caller does
+        # with each one between yields
+        with trace.stage("find_expired"):
+            issue = next(issues, None)
+        if issue is None:
+            return
+        created_at = datetime.strptime(issue["created_at"], "%Y-%m-%dT%H:%M:%SZ")
+        # Issues come oldest first, so everything after this one is too new
+        if created_at > cutoff:
+            return
+        labels = [label["name"] for label in issue["labels"]]
+        hold = config["labels"]["hold"] in labels
+        org_index.set_hold(issue["number"], hold)
+        if hold:
+            logging.info(f"Skipping issue {issue['number']}: on hold")
+            continue
+        yield issue
+
+
+# Scheduled teardown: stream expired issues into the deletion pool, then
+# report on each issue once its orgs are done
+def sweep(admin_client, issue_ops_client, working_repo, config, org_index):
+    pending = []
+    with ThreadPoolExecutor(max_workers=config["max-workers"]) as pool:
+        for issue in expired_issues(issue_ops_client, config, org_index):
+            logging.info(f"Tearing down issue {issue['number']}")
+            issue = gh.Issue(issue_ops_client, working_repo, issue["number"])
+            # An issue whose orgs can't be told is left for someone to look at
+            try:
+                org_names = find_org_names(issue, org_index)
+            except Exception as e:
+                logging.error(f"Skipping issue {issue.issue_num}: {e}")
+                continue
+            pending.append(
+                (issue, submit_deletions(admin_client, pool, org_names, config))
+            )
+
+        for issue, futures in pending:
+            state = collect_deletions(futures)
+            org_index.mark_deleted(state["success"])
+            report_teardown(issue, state, config)
+
+
+# Admin client for deletions, sized for the deletion pool
+def get_admin_client(config, admin_token, tracer):
+    admin_client = client.Client(admin_token)
+    admin_client.set_pool_size(config["max-workers"])
+    admin_client.add_hook(tracer)
+    # Secondary limits default to github.com's; GHES or the simulator may differ
+    if "content-limits" in config:
+        admin_client.scheduler.set_content_windows(config["content-limits"])
+    return admin_client
+
+
+# One bulk reconciliation against the enterprise keeps the index current,
+# so per-issue lookups don't need any API calls
+def reconcile_index(admin_client, config):
+    org_index = index.OrgIndex(config["index-path"])
+    try:
+        orphans = org_index.reconcile(
+            admin_client.enterprise.get_org_logins(config["enterprise"]),
+            config["org-prefix"],
+        )
+        for orphan in orphans:
+            logging.warning(f"Bootcamp org not in the index: {orphan}")
+    except Exception:
+        logging.warning("Could not reconcile the org index, it may be stale")
+    for issue, bootcamp_date, hold, alive in org_index.alive():
+        logging.info(
+            f"Issue {issue} ({bootcamp_date}): {alive} orgs alive{', on hold' if hold else ''}"
+        )
+    return org_index
+
+
 def main():
+    setup_logging()
+
+    # Get Arguments
+    working_repo = sys.argv[1]
+    issue_num = sys.argv[2]
+
+    # Get Environment Variables
+    github_token = os.environ.get("GITHUB_TOKEN")
+    admin_token = os.environ.get("ADMIN_TOKEN")
+
+    logging.info("Starting bootcamp teardown")
+    logging.info(f"Working repo: {working_repo}")
+
     # Get config
     config = get_config("config.yml")
     for key, value in config.items():
         logging.info(f"{key}: {value}")
 
+    # Every request is traced; the summary goes to the Actions job summary
+    tracer = trace.Tracer(config["trace-path"])
+    atexit.register(tracer.finish)
+    # Setup clients
+    admin_client = get_admin_client(config, admin_token, tracer)
+    # Comment pages are revalidated with ETags, so unchanged threads are free.
+    # GITHUB_TOKEN is new every job but only ever reads this repo, so its
+    # entries are kept under the repo for the next run to find.
+    comment_cache = cache.Cache(config["cache-path"], config["cache-ttl"])
+
+    org_index = reconcile_index(admin_client, config)
+
     # Manual delete
     if issue_num != "0":
-        issue_ops_client = client.Client(github_token, working_repo, issue_num)
-        issue_comments = issue_ops_client.issue.get_comments()
-        org_names = get_org_names(issue_comments)
-        state = delete_orgs(org_names)
-        issue_ops_client.issue.add_comment(
-            comments.teardown_complete
-            + "### Deleted Orgs: \n\n"
-            + "\n".join(state["success"])
-            + "\n\n### Failures: \n\n"
-            + "\n".join(state["fail"])
+        issue_ops_client = client.Client(
+            github_token,
+            working_repo,
+            issue_num,
+            cache=comment_cache,
+            cache_scope=working_repo,
         )
-        issue_ops_client.issue.apply_label(config["labels"]["done"])
-        issue_ops_client.issue.close()
-
-    # Get all open issues
-    # elif issue_num == '0':
-    #     open_issues = issue_ops_client.issue.get(config['labels']['open'])
-    #     for issue in open_issues:
-    #         issue_ops_client = client.Client(github_token, working_repo, issue['number'])
-    #         issue_comments = issue_ops_client.issue.get_comments()
-    #         org_names = get_org_names(issue_comments)
-    #         state = delete_orgs(org_names)
-    #         issue_ops_client.issue.add_comment(comments.teardown_complete + "### Deleted Orgs: \n\n" + '\n'.join(state['success']) + "\n\n### Failures: \n\n" + '\n'.join(state['fail']))
-    #         issue_ops_client.issue.apply_label(config['labels']['done'])
-    #         issue_ops_client.issue.close()
-    #         time.sleep(5)
-
-    # Compare issue creation date to today's date
+        issue_ops_client.add_hook(tracer)
+        org_names = find_org_names(issue_ops_client.issue, org_index)
+        state = delete_orgs(admin_client, org_names, config)
+        org_index.mark_deleted(state["success"])
+        report_teardown(issue_ops_client.issue, state, config)
 
-    # evaluate if difference is = to or > the config days\
-
-    # For each issue that meets the criteria, delete the orgs
-
-    # Add comment to issue with orgs deleted
+    # Scheduled delete of every bootcamp past its duration
+    elif issue_num == "0":
+        issue_ops_client = client.Client(
+            github_token, working_repo, cache=comment_cache, cache_scope=working_repo
+        )
+        issue_ops_client.add_hook(tracer)
+        sweep(admin_client, issue_ops_client, working_repo, config, org_index)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+import httpx
+import gh.agh as agh
+import gh.cache as cache
+import gh.ratelimit as ratelimit
+import gh.retry as retry
+import gh.trace as trace
+
+# Async counterpart to gh.client.Client for high fan-out work. It runs on httpx
+# with HTTP/2, so hundreds of in-flight requests share a few multiplexed
+# connections. httpx is optional: pip install "httpx[http2]"
+
+
+class AsyncClient:
+    def __init__(
+        self,
+        token,
+        working_repo=None,
+        issue_num=None,
+        pool_size=10,
+        timeout=60,
+        cache=None,
+        cache_scope=None,
+    ):
+        self.headers = {
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/vnd.github.v3+json",
+            "Content-Type": "application/json",
+        }
+        self.base_url = os.environ.get("GITHUB_API_URL", "https://api.github.com")
+        self.graphql_url = os.environ.get(
+            "GITHUB_GRAPHQL_URL", f"{self.base_url}/graphql"
+        )
+        self.session = httpx.AsyncClient(
+            http2=True,
+            headers=self.headers,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size
+            ),
+        )
+        self.scheduler = ratelimit.Scheduler(self.graphql_url)
+        self.retry = retry.RetryPolicy(
+            connect_timeouts=(httpx.ConnectTimeout,),
+            transport_errors=(httpx.TimeoutException, httpx.NetworkError),
+        )
+        # Optional gh.cache.Cache, shared with the sync client's layout and
+        # scoped the same way (see Client)
+        self.cache = cache
+        self.cache_scope = (
+            cache_scope or hashlib.sha256(str(token).encode()).hexdigest()[:16]
+        )
+        # Called with an event dict after every request; see gh.trace
+        self.hooks = []
+        self.issue = agh.Issue(self, working_repo, issue_num)
+        self.user = agh.User(self)
+        self.repo = agh.Repo(self)
+        self.org = agh.Org(self)
+        self.enterprise = agh.Enterprise(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        await self.session.aclose()
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    # Hooks only observe; a failing hook must not fail the request
+    def notify(self, event):
+        for hook in self.hooks:
+            try:
+                hook(event)
+            except Exception as e:
+                logging.warning(f"Request hook failed: {e}")
+
+    # Every API call made by the async resource classes goes through here. As
+    # with Client, only GETs asked to revalidate use the cache.
+    async def request(self, method, url, idempotent=None, revalidate=False, **kwargs):
+        if revalidate and self.cache is not None and method.upper() == "GET":
+            return await self.conditional_get(url, **kwargs)
+        return await self.send(method, url, idempotent, **kwargs)
+
+    # Follows the Link header, yielding one page of results at a time
+    async def paginate(self, url, params=None, revalidate=False):
+        while url:
+            response = await self.request(
+                "GET", url, params=params, revalidate=revalidate
+            )
+            yield response
+            url = response.links.get("next", {}).get("url")
+            # The next link already carries the query string
+            params = None
+
+    # Makes a call built in gh.calls and returns what it made of the response
+    async def call(self, api_call):
+        with trace.expect(*api_call.expect):
+            response = await self.request(
+                api_call.method, api_call.url, **api_call.kwargs
+            )
+        return api_call.parse(response)
+
+    # GET with If-None-Match, answered from the cached body on a 304
+    async def conditional_get(self, url, **kwargs):
+        params = json.dumps(kwargs.get("params"), sort_keys=True)
+        key = f"GET {self.cache_scope} {url} {params}"
+        entry = self.cache.entry(key)
+        headers = dict(kwargs.pop("headers", None) or {})
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+
+        response = await self.send("GET", url, headers=headers, **kwargs)
+        if response.status_code == 304 and entry:
+            self.cache.touch(key)
+            return httpx.Response(
+                200,
+                headers=entry["value"]["headers"],
+                content=entry["value"]["body"].encode(),
+                request=response.request,
+            )
+        if response.status_code == 200 and "ETag" in response.headers:
+            value = cache.response_entry(response)
+            self.cache.set(key, value, response.headers["ETag"])
+        return response
+
+    # Sends a request, retrying transient failures. Pass idempotent=True for
+    # POSTs that are safe to repeat.
+    async def send(self, method, url, idempotent=None, **kwargs):
+        classes = self.scheduler.classify(method, url, kwargs.get("json"))
+        idempotent = self.retry.is_idempotent(method, idempotent)
+        start = time.time()
+        waited = 0
+        for attempt in range(self.retry.max_attempts):
+            last_attempt = attempt == self.retry.max_attempts - 1
+            wait = self.scheduler.reserve(classes)
+            if wait > 0:
+                waited += wait
+                await asyncio.sleep(wait)
+            try:
+                response = await self.session.request(method, url, **kwargs)
+            except httpx.HTTPError as e:
+                if last_attempt or not self.retry.should_retry_error(e, idempotent):
+                    self.trace(method, url, kwargs, start, waited, attempt, None, e)
+                    raise
+                logging.warning(f"Retrying {method} {url} after error: {e}")
+                await asyncio.sleep(self.retry.backoff(attempt))
+                continue
+
+            rate_limited = self.scheduler.update(classes, response)
+            if last_attempt or not self.retry.should_retry_response(
+                response, idempotent, rate_limited
+            ):
+                self.trace(method, url, kwargs, start, waited, attempt, response)
+                return response
+            logging.warning(
+                f"Retrying {method} {url} after response code {response.status_code}"
+            )
+            # Rate limit pauses are applied by the scheduler on the next reserve
+            if not rate_limited:
+                await asyncio.sleep(self.retry.backoff(attempt))
+
+    def trace(self, method, url, kwargs, start, waited, attempt, response, error=None):
+        if self.hooks:
+            self.notify(
+                trace.event(
+                    self, method, url, kwargs, start, waited, attempt, response, error
+                )
+            )
@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import random
+import time
+import gh.calls as calls
+
+# Async counterparts to the resource classes in gh.gh, with the same method
+# surface. Every method is a coroutine (or an async generator where the sync
+# version yields) and is used with gh.aclient.AsyncClient. The calls
+# themselves are shared with gh.gh through gh.calls.
+
+
+# Poll the async check() with exponential backoff and jitter until it returns
+# True. Raises once the overall deadline (in seconds) has passed.
+async def wait_until(check, description, timeout=300, initial_delay=1, max_delay=30):
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    while not await check():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            e = f"Timed out after {timeout}s waiting for {description}"
+            logging.error(e)
+            raise Exception(e)
+        await asyncio.sleep(min(delay / 2 + random.uniform(0, delay / 2), remaining))
+        delay = min(delay * 2, max_delay)
+    logging.info(f"{description} is ready")
+
+
+class Repo:
+    def __init__(self, client):
+        self.client = client
+
+    async def fork(self, name_with_owner, org_name):
+        return await self.client.call(
+            calls.repo_fork(self.client, name_with_owner, org_name)
+        )
+
+    # Creates a copy of a template repository in org_name. Unlike a fork it can
+    # be created private, so there is no visibility change to follow up with.
+    async def create_from_template(self, template, org_name, private=True):
+        return await self.client.call(
+            calls.repo_from_template(self.client, template, org_name, private)
+        )
+
+    async def visibility(self, name_with_owner, visibility):
+        return await self.client.call(
+            calls.repo_visibility(self.client, name_with_owner, visibility)
+        )
+
+    async def exists(self, name_with_owner):
+        return await self.client.call(calls.repo_exists(self.client, name_with_owner))
+
+    # Forks are created asynchronously, so wait for the repo before touching it
+    async def wait_until_ready(self, name_with_owner, timeout=300):
+        await wait_until(
+            lambda: self.exists(name_with_owner),
+            f"repository {name_with_owner}",
+            timeout,
+        )
+
+
+class Org:
+    def __init__(self, client):
+        self.client = client
+
+    async def create(self, enterprise_id, org_name, admin_logins, billing_email):
+        created = await self.client.call(
+            calls.org_create(
+                self.client, enterprise_id, org_name, admin_logins, billing_email
+            )
+        )
+        if created:
+            return created
+        return calls.org_reuse(await self.get(org_name), org_name)
+
+    async def get(self, org_name):
+        return await self.client.call(calls.org_get(self.client, org_name))
+
+    # Which of the logins are taken, looked up in batches. A login is taken
+    # if a user or an org has it, unless it is an org we administer listed in
+    # reusable; create() reuses those.
+    async def get_taken(self, logins, chunk_size=50, reusable=()):
+        taken = []
+        for start in range(0, len(logins), chunk_size):
+            chunk = logins[start : start + chunk_size]
+            taken += await self.client.call(
+                calls.org_taken(self.client, chunk, reusable)
+            )
+        return taken
+
+    async def exists(self, org_name):
+        return await self.client.call(calls.org_exists(self.client, org_name))
+
+    # New orgs take a moment to become visible to the REST API
+    async def wait_until_ready(self, org_name, timeout=300):
+        await wait_until(
+            lambda: self.exists(org_name), f"organization {org_name}", timeout
+        )
+
+    # Org deletion is asynchronous; the 202 only means it has been queued
+    async def wait_until_deleted(self, org_name, timeout=300):
+        async def deleted():
+            return not await self.exists(org_name)
+
+        await wait_until(
+            deleted,
+            f"deletion of organization {org_name}",
+            timeout,
+        )
+
+    async def invite_member(self, user_id, org_name):
+        return await self.client.call(calls.org_invite(self.client, user_id, org_name))
+
+    async def delete(self, org_name):
+        return await self.client.call(calls.org_delete(self.client, org_name))
+
+
+class Enterprise:
+    def __init__(self, client):
+        self.client = client
+
+    async def get_id(self, enterprise_slug):
+        id = calls.cached_enterprise_id(self.client, enterprise_slug)
+        if id:
+            return id
+        return await self.client.call(calls.enterprise_id(self.client, enterprise_slug))
+
+    # Lazily yields the login of every org in the enterprise, 100 per call
+    async def get_org_logins(self, enterprise_slug):
+        cursor = None
+        while True:
+            logins, cursor = await self.client.call(
+                calls.enterprise_orgs(self.client, enterprise_slug, cursor)
+            )
+            for login in logins:
+                yield login
+            if cursor is None:
+                return
+
+
+class Issue:
+    def __init__(self, client, working_repo=None, issue_num=None):
+        self.client = client
+        if working_repo:
+            self.working_repo = working_repo
+        if issue_num:
+            self.issue_num = issue_num
+
+    async def get(self, labels=None):
+        return await self.client.call(calls.issue_get(self, labels))
+
+    # Lazily pages through the repo's issues, oldest first, skipping pull requests
+    async def get_all(self, labels=None, state="open"):
+        listing = calls.issue_list(self, labels, state)
+        async for response in self.client.paginate(listing.url, **listing.kwargs):
+            for item in listing.parse(response):
+                yield item
+
+    async def apply_label(self, label):
+        return await self.client.call(calls.issue_apply_label(self, label))
+
+    async def remove_label(self, label):
+        return await self.client.call(calls.issue_remove_label(self, label))
+
+    async def add_comment(self, comment):
+        return await self.client.call(calls.issue_add_comment(self, comment))
+
+    # Replaces the body of a comment, e.g. one made by add_comment
+    async def edit_comment(self, comment_id, comment):
+        return await self.client.call(
+            calls.issue_edit_comment(self, comment_id, comment)
+        )
+
+    # Lazily yields every comment on the issue, one page at a time. With a
+    # cache on the client, unchanged pages are revalidated for free.
+    async def get_comments(self):
+        listing = calls.issue_comments(self)
+        async for response in self.client.paginate(listing.url, **listing.kwargs):
+            for item in listing.parse(response):
+                yield item
+        logging.info(f"Successfully got comments for issue: {self.issue_num}")
+
+    # The last few comments in a single GraphQL call, oldest first
+    async def get_recent_comments(self, count=20):
+        return await self.client.call(calls.issue_recent_comments(self, count))
+
+    async def close(self):
+        return await self.client.call(calls.issue_close(self))
+
+
+class User:
+    def __init__(self, client):
+        self.client = client
+
+    async def get_id(self, username):
+        return await self.client.call(calls.user_id(self.client, username))
+
+    # Resolve many handles in a few GraphQL round trips. Returns a dict of
+    # handle -> id for the users that exist and a list of handles that don't.
+    async def get_ids(self, usernames, chunk_size=50):
+        ids = calls.cached_user_ids(self.client, usernames)
+        not_found = []
+        usernames = [username for username in usernames if username not in ids]
+        for start in range(0, len(usernames), chunk_size):
+            chunk = usernames[start : start + chunk_size]
+            found, missing = await self.client.call(calls.user_ids(self.client, chunk))
+            ids.update(found)
+            not_found += missing
+        return ids, not_found
@@ -0,0 +1,80 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+# Values like enterprise and user ids almost never change
+DEFAULT_TTL = 7 * 24 * 60 * 60
+
+# Headers describing the original transfer, which don't apply to a cached body
+TRANSFER_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+
+# Cache entry for a GET response, to be replayed when GitHub answers 304
+def response_entry(response):
+    headers = {
+        name: value
+        for name, value in response.headers.items()
+        if name.lower() not in TRANSFER_HEADERS
+    }
+    return {"body": response.text, "headers": headers}
+
+
+# Small SQLite key/value store that survives between runs. Entries can carry
+# an ETag so stale ones can be revalidated with a conditional request.
+class Cache:
+    def __init__(self, path, ttl=DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS entries "
+            "(key TEXT PRIMARY KEY, value TEXT, etag TEXT, expires REAL)"
+        )
+        # Entries that expired before this run won't be revalidated in time to
+        # be worth keeping, and would otherwise pile up between runs
+        purged = self.db.execute(
+            "DELETE FROM entries WHERE expires < ?", (time.time(),)
+        ).rowcount
+        self.db.commit()
+        logging.info(f"Using cache: {path} ({purged} expired entries purged)")
+
+    # Returns the cached value if it hasn't expired, otherwise None
+    def get(self, key):
+        entry = self.entry(key)
+        if entry and entry["expires"] > time.time():
+            return entry["value"]
+        return None
+
+    # Returns the entry even if expired, so its ETag can be revalidated
+    def entry(self, key):
+        with self.lock:
+            row = self.db.execute(
+                "SELECT value, etag, expires FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"value": json.loads(row[0]), "etag": row[1], "expires": row[2]}
+
+    def set(self, key, value, etag=None, ttl=None):
+        expires = time.time() + (self.ttl if ttl is None else ttl)
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), etag, expires),
+            )
+            self.db.commit()
+
+    # Extend an entry after GitHub confirmed it is unchanged
+    def touch(self, key, ttl=None):
+        expires = time.time() + (self.ttl if ttl is None else ttl)
+        with self.lock:
+            self.db.execute(
+                "UPDATE entries SET expires = ? WHERE key = ?", (expires, key)
+            )
+            self.db.commit()
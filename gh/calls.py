@@ -0,0 +1,508 @@
+import logging
+import gh.graphql as graphql
+
+# The API calls behind the resource classes, written once for both clients.
+# Each function here builds a Call: the request to make and how to read its
+# response. gh.gh makes them with Client.call and gh.agh with
+# AsyncClient.call, so the two only differ in whether the request is awaited.
+
+# Error messages GitHub uses when the thing being created is already there
+ALREADY_EXISTS = ("already", "taken", "unavailable", "not available")
+
+
+# True if an error response says the target of a create call already exists
+def already_exists(response):
+    return any(message in response.text.lower() for message in ALREADY_EXISTS)
+
+
+class Call:
+    def __init__(self, method, url, parse, expect=(), **kwargs):
+        self.method = method
+        self.url = url
+        # Turns the response into what the resource method returns, or raises
+        self.parse = parse
+        # Statuses that answer the call rather than fail it; see trace.expect
+        self.expect = expect
+        # Passed on to the client's request (or paginate, for listings)
+        self.kwargs = kwargs
+
+
+def graphql_call(client, query, variables, parse):
+    return Call(
+        "POST",
+        client.graphql_url,
+        parse,
+        idempotent=True,
+        json={"query": query, "variables": variables},
+    )
+
+
+def repo_fork(client, name_with_owner, org_name):
+    def parse(response):
+        if response.status_code == 202:
+            logging.info(f"Successfully forked {name_with_owner} to {org_name}")
+            return response.json()["full_name"]
+        else:
+            e = f"Error forking repository.  Response: {response.json()}"
+            logging.error(e)
+            raise Exception(e)
+
+    url = f"{client.base_url}/repos/{name_with_owner}/forks"
+    # Adding the default_branch_only parameter to the fork request
+    # to avoid forking all branches of the repo and causing hang-ups
+    data = {"organization": org_name, "default_branch_only": True}
+    # Forking again returns the existing fork, so retries are safe
+    return Call("POST", url, parse, idempotent=True, json=data)
+
+
+def repo_from_template(client, template, org_name, private):
+    name = template.split("/")[1]
+
+    def parse(response):
+        if response.status_code == 201 or (
+            response.status_code == 422 and already_exists(response)
+        ):
+            logging.info(f"Successfully created {org_name}/{name} from {template}")
+            return f"{org_name}/{name}"
+        else:
+            e = f"Error creating repository from template.  Response: {response.json()}"
+            logging.error(e)
+            raise Exception(e)
+
+    url = f"{client.base_url}/repos/{template}/generate"
+    data = {
+        "owner": org_name,
+        "name": name,
+        "private": private,
+        "include_all_branches": False,
+    }
+    # A retry after a lost response finds the repo already there
+    return Call("POST", url, parse, idempotent=True, json=data)
+
+
+def repo_visibility(client, name_with_owner, visibility):
+    def parse(response):
+        if response.status_code == 200:
+            logging.info(
+                f"Successfully set visibility of {name_with_owner} to {visibility}"
+            )
+            return
+        else:
+            e = f"Error setting visibility of repository.  Response: {response.json()}"
+            logging.error(e)
+            raise Exception(e)
+
+    url = f"{client.base_url}/repos/{name_with_owner}"
+    return Call("PATCH", url, parse, json={"visibility": visibility})
+
+
+def repo_exists(client, name_with_owner):
+    def parse(response):
+        if response.status_code == 200:
+            return True
+        elif response.status_code == 404:
+            return False
+        else:
+            e = f"Error getting repository {name_with_owner}.  Response: {response.json()}"
+            logging.error(e)
+            raise Exception(e)
+
+    url = f"{client.base_url}/repos/{name_with_owner}"
+    # Readiness polls expect a 404 until the target exists (or is gone)
+    return Call("GET", url, parse, expect=(404,))
+
+
+# Returns the new org's id and name, or None if the name is already in use
+# (possibly by an earlier try of this call); see org_reuse
+def org_create(client, enterprise_id, org_name, admin_logins, billing_email):
+    def parse(response):
+        if response.status_code == 200 and "errors" not in response.json():
+            id = response.json()["data"]["createEnterpriseOrganization"][
+                "organization"
+            ]["id"]
+            name = response.json()["data"]["createEnterpriseOrganization"][
+                "organization"
+            ]["name"]
+            logging.info(f"Successfully created organization: {name}")
+            return id, name
+        elif response.status_code == 200 and already_exists(response):
+            return None
+        else:
+            e = f"Error creating organization: {org_name} Response code: {response.status_code} Response: {response.json()}"
+            logging.error(e)
+            raise Exception(e)
+
+    variables = {
+        "enterpriseId": enterprise_id,
+        "login": org_name,
+        "profileName": org_name,
+        "adminLogins": admin_logins,
+        "billingEmail": billing_email,
+    }
+    # A retried create that already went through shows up as "already exists"
+    return graphql_call(client, graphql.create_org, variables, parse)
+
+
+# The id and name of an existing org, as org_get found it, if it can stand in
+# for the one org_create was asked for. Setup only creates names it checked
+# were free (or its own, see org_taken), so an org we administer here is the
+# result of a retried create whose first response was lost.
+def org_reuse(org, org_name):
+    # Only reuse the org if we administer it, otherwise it's a real name clash
+    if org and org["viewerCanAdminister"]:
+        logging.info(f"Organization already exists: {org['login']}")
+        return org["id"], org["name"]
+    e = f"Error creating organization: {org_name} is taken by an organization we don't administer"
+    logging.error(e)
+    raise Exception(e)
+
+
+def org_get(client, org_name):
+    def parse(response):
+        if response.status_code == 200:
+            return response.json()["data"]["organization"]
+        else:
+            e = f"Error getting organization: {org_name} Response: {response.json()}"
+            logging.error(e)
+            raise Exception(e)
+
+    return graphql_call(client, graphql.get_org, {"login": org_name}, parse)
+
+
+# Which of the logins are taken. A login is taken if a user or any org has it,
+# except an org we administer that is in reusable (ones this bootcamp created
+# on an earlier run); create reuses those.
+def org_taken(client, logins, reusable=()):
+    reusable = {login.lower() for login in reusable}
+
+    def parse(response):
+        body = response.json()
+        errors = [
+            error
+            for error in body.get("errors", [])
+            if error.get("type") != "NOT_FOUND"
+        ]
+        if response.status_code != 200 or errors or "data" not in body:
+            e = f"Error looking up organization names: {body}"
+            logging.error(e)
+            raise Exception(e)
+        taken = []
+        for i, login in enumerate(logins):
+            owner = body["data"].get(f"o{i}")
+            if owner and not (
+                owner.get("viewerCanAdminister") and login.lower() in reusable
+            ):
+                taken.append(login)
+        return taken
+
+    variables = {f"o{i}": login for i, login in enumerate(logins)}
+    return graphql_call(client, graphql.get_owners(len(logins)), variables, parse)
+
+
+def org_exists(client, org_name):
+    def parse(response):
+        if response.status_code == 200:
+            return True
+        elif response.status_code == 404:
+            return False
+        else:
+            e = f"Error getting organization: {org_name}. Response: {response.json()}"
+            logging.error(e)
+            raise Exception(e)
+
+    url = f"{client.base_url}/orgs/{org_name}"
+    # Readiness polls expect a 404 until the target exists (or is gone)
+    return Call("GET", url, parse, expect=(404,))
+
+
+def org_invite(client, user_id, org_name):
+    def parse(response):
+        if response.status_code == 201:
+            logging.info(f"Successfully invited {user_id} to {org_name}")
+            return
+        elif response.status_code == 422 and already_exists(response):
+            logging.info(f"{user_id} is already invited to {org_name}")
+            return
+        else:
+            e = f"Error inviting user to organization. Response: {response.json()}"
+            logging.error(e)
+            raise Exception(e)
+
+    url = f"{client.base_url}/orgs/{org_name}/invitations"
+    data = {"invitee_id": user_id, "role": "admin"}
+    return Call("POST", url, parse, idempotent=True, json=data)
+
+
+def org_delete(client, org_name):
+    def parse(response):
+        if response.status_code == 202:
+            logging.info(f"Successfully deleted organization: {org_name}")
+            return
+        elif response.status_code == 404:
+            # A retried delete can find the org already gone
+            logging.info(f"Organization already deleted: {org_name}")
+            return
+        else:
+            e = f"Error deleting organization: {org_name}. Response: {response.json()}"
+            logging.error(e)
+            raise Exception(e)
+
+    return Call("DELETE", f"{client.base_url}/orgs/{org_name}", parse)
+
+
+# The enterprise id from the client's cache, or None if it has to be looked up
+def cached_enterprise_id(client, enterprise_slug):
+    if client.cache is None:
+        return None
+    id = client.cache.get(f"enterprise:{enterprise_slug.lower()}")
+    if id:
+        logging.info(f"Using cached enterprise id: {id}")
+    return id
+
+
+def enterprise_id(client, enterprise_slug):
+    def parse(response):
+        if response.status_code == 200:
+            id = response.json()["data"]["enterprise"]["id"]
+            logging.info(f"Successfully got enterprise id: {id}")
+            if client.cache is not None:
+                client.cache.set(f"enterprise:{enterprise_slug.lower()}", id)
+            return id
+        else:
+            e = f"Error getting enterprise id: {response.json()}"
+            logging.error(e)
+            raise Exception(e)
+
+    return graphql_call(client, graphql.get_ent_id, {"slug": enterprise_slug}, parse)
+
+
+# One page of the enterprise's org logins (100 per call), and the cursor of
+# the next page or None after the last one
+def enterprise_orgs(client, enterprise_slug, cursor=None):
+    def parse(response):
+        if response.status_code != 200 or "errors" in response.json():
+            e = f"Error getting enterprise organizations: {response.json()}"
+            logging.error(e)
+            raise Exception(e)
+        organizations = response.json()["data"]["enterprise"]["organizations"]
+        logins = [org["login"] for org in organizations["nodes"]]
+        if not organizations["pageInfo"]["hasNextPage"]:
+            return logins, None
+        return logins, organizations["pageInfo"]["endCursor"]
+
+    variables = {"slug": enterprise_slug, "cursor": cursor}
+    return graphql_call(client, graphql.get_ent_orgs, variables, parse)
+
+
+# The issue calls take the Issue resource, for its repo and number
+def issue_get(issue, labels=None):
+    def parse(response):
+        if response.status_code == 200:
+            logging.info(f"Successfully got issue: {issue.issue_num}")
+            return response.json()
+        else:
+            e = f"Error getting issue: {response.json()}"
+            logging.error(e)
+            raise Exception(e)
+
+    if labels:
+        url = (
+            f"{issue.client.base_url}/repos/{issue.working_repo}/issues?labels={labels}"
+        )
+    else:
+        url = f"{issue.client.base_url}/repos/{issue.working_repo}/issues/{issue.issue_num}"
+    return Call("GET", url, parse)
+
+
+# A listing, made with paginate. Each page parses to its issues, oldest
+# first, without pull requests.
+def issue_list(issue, labels=None, state="open"):
+    def parse(response):
+        if response.status_code != 200:
+            e = f"Error getting issues: {response.json()}"
+            logging.error(e)
+            raise Exception(e)
+        return [item for item in response.json() if "pull_request" not in item]
+
+    url = f"{issue.client.base_url}/repos/{issue.working_repo}/issues"
+    params = {"state": state, "sort": "created", "direction": "asc"}
+    params["per_page"] = 100
+    if labels:
+        params["labels"] = labels
+    return Call("GET", url, parse, params=params)
+
+
+def issue_apply_label(issue, label):
+    def parse(response):
+        if response.status_code == 200:
+            logging.info(
+                f"Successfully applied label {label} to issue {issue.issue_num}"
+            )
+        else:
+            e = f"Error applying label {label} to issue {issue.issue_num}: {response.json()}"
+            logging.error(e)
+            raise Exception(e)
+
+    url = f"{issue.client.base_url}/repos/{issue.working_repo}/issues/{issue.issue_num}/labels"
+    return Call("POST", url, parse, idempotent=True, json=[label])
+
+
+def issue_remove_label(issue, label):
+    def parse(response):
+        if response.status_code == 200:
+            logging.info(
+                f"Successfully removed label {label} from issue {issue.issue_num}"
+            )
+        elif response.status_code == 404:
+            # The label is already off the issue, e.g. removed by hand
+            logging.info(f"Label {label} is not on issue {issue.issue_num}")
+        else:
+            e = f"Error removing label {label} from issue {issue.issue_num}: {response.json()}"
+            logging.error(e)
+            raise Exception(e)
+
+    url = f"{issue.client.base_url}/repos/{issue.working_repo}/issues/{issue.issue_num}/labels/{label}"
+    return Call("DELETE", url, parse)
+
+
+def issue_add_comment(issue, comment):
+    def parse(response):
+        if response.status_code == 201:
+            logging.info(f"Successfully added comment to issue {issue.issue_num}")
+            return response.json()["id"]
+        else:
+            e = f"Error adding comment to issue {issue.issue_num}: {response.json()}"
+            logging.error(e)
+            raise Exception(e)
+
+    url = f"{issue.client.base_url}/repos/{issue.working_repo}/issues/{issue.issue_num}/comments"
+    return Call("POST", url, parse, json={"body": comment})
+
+
+def issue_edit_comment(issue, comment_id, comment):
+    def parse(response):
+        if response.status_code == 200:
+            logging.info(f"Successfully edited comment on issue {issue.issue_num}")
+        else:
+            e = f"Error editing comment on issue {issue.issue_num}: {response.json()}"
+            logging.error(e)
+            raise Exception(e)
+
+    url = f"{issue.client.base_url}/repos/{issue.working_repo}/issues/comments/{comment_id}"
+    return Call("PATCH", url, parse, json={"body": comment})
+
+
+# A listing, made with paginate. With a cache on the client, unchanged pages
+# are revalidated for free.
+def issue_comments(issue):
+    def parse(response):
+        if response.status_code != 200:
+            e = f"Error getting comments for issue: {response.json()}"
+            logging.error(e)
+            raise Exception(e)
+        return response.json()
+
+    url = f"{issue.client.base_url}/repos/{issue.working_repo}/issues/{issue.issue_num}/comments"
+    return Call("GET", url, parse, params={"per_page": 100}, revalidate=True)
+
+
+def issue_recent_comments(issue, count):
+    def parse(response):
+        if response.status_code == 200 and "errors" not in response.json():
+            logging.info(
+                f"Successfully got recent comments for issue: {issue.issue_num}"
+            )
+            found = response.json()["data"]["repository"]["issue"]
+            return found["comments"]["nodes"]
+        else:
+            e = f"Error getting recent comments for issue: {response.json()}"
+            logging.error(e)
+            raise Exception(e)
+
+    owner, name = issue.working_repo.split("/")
+    variables = {
+        "owner": owner,
+        "name": name,
+        "number": int(issue.issue_num),
+        "count": count,
+    }
+    return graphql_call(issue.client, graphql.get_recent_comments, variables, parse)
+
+
+def issue_close(issue):
+    def parse(response):
+        if response.status_code == 200:
+            logging.info(f"Successfully closed issue {issue.issue_num}")
+        else:
+            e = f"Error closing issue {issue.issue_num}: {response.json()}"
+            logging.error(e)
+            raise Exception(e)
+
+    url = f"{issue.client.base_url}/repos/{issue.working_repo}/issues/{issue.issue_num}"
+    return Call("PATCH", url, parse, json={"state": "closed"})
+
+
+def user_id(client, username):
+    def parse(response):
+        if response.status_code == 200:
+            id = response.json()["id"]
+            logging.info(f"{username} ID: {id}")
+            return id
+        elif response.status_code == 404:
+            e = f"User {username} does not exist"
+            logging.error(e)
+            raise Exception(e)
+        else:
+            e = f"Error getting user id: {response.json()}"
+            logging.error(e)
+            raise Exception(e)
+
+    url = f"{client.base_url}/users/{username}"
+    return Call("GET", url, parse, revalidate=True)
+
+
+# The ids of the usernames that are in the client's cache, by username
+def cached_user_ids(client, usernames):
+    ids = {}
+    if client.cache is None:
+        return ids
+    for username in usernames:
+        id = client.cache.get(f"user:{username.lower()}")
+        if id:
+            ids[username] = id
+    if ids:
+        logging.info(f"Using cached ids for {len(ids)} users")
+    return ids
+
+
+# Resolves the usernames in one GraphQL call. Parses to a dict of username ->
+# id for the users that exist and a list of usernames that don't.
+def user_ids(client, usernames):
+    def parse(response):
+        body = response.json()
+        # Unknown logins come back as NOT_FOUND errors next to the other results
+        errors = [
+            error
+            for error in body.get("errors", [])
+            if error.get("type") != "NOT_FOUND"
+        ]
+        if response.status_code != 200 or errors or "data" not in body:
+            e = f"Error getting user ids: {body}"
+            logging.error(e)
+            raise Exception(e)
+        ids = {}
+        not_found = []
+        for i, username in enumerate(usernames):
+            user = body["data"].get(f"u{i}")
+            if user:
+                ids[username] = user["databaseId"]
+                logging.info(f"{username} ID: {user['databaseId']}")
+                if client.cache is not None:
+                    client.cache.set(f"user:{username.lower()}", user["databaseId"])
+            else:
+                logging.error(f"User {username} does not exist")
+                not_found.append(username)
+        return ids, not_found
+
+    variables = {f"u{i}": username for i, username in enumerate(usernames)}
+    return graphql_call(client, graphql.get_users(len(usernames)), variables, parse)
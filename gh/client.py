@@ -1,20 +1,177 @@
-import requests
+import hashlib
 import logging
+import os
 import json
+import time
+import gh.cache as cache
 import gh.gh as gh
+import gh.ratelimit as ratelimit
+import gh.retry as retry
+import gh.trace as trace
 
 
 class Client:
-    def __init__(self, token, working_repo=None, issue_num=None):
+    def __init__(
+        self,
+        token,
+        working_repo=None,
+        issue_num=None,
+        pool_size=10,
+        timeout=60,
+        cache=None,
+        cache_scope=None,
+    ):
         self.headers = {
             "Authorization": f"Bearer {token}",
             "Accept": "application/vnd.github.v3+json",
             "Content-Type": "application/json",
         }
-        self.base_url = "https://api.github.com"
-        self.graphql_url = "https://api.github.com/graphql"
+        self.base_url = os.environ.get("GITHUB_API_URL", "https://api.github.com")
+        self.graphql_url = os.environ.get(
+            "GITHUB_GRAPHQL_URL", f"{self.base_url}/graphql"
+        )
+        # requests is imported where it is used rather than at the top: it is
+        # most of the import time of the package, and importing the scripts
+        # as libraries never makes a request
+        import requests
+
+        # One keep-alive session per client so connections are reused across calls
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.set_pool_size(pool_size)
+        self.scheduler = ratelimit.Scheduler(self.graphql_url)
+        self.retry = retry.RetryPolicy()
+        self.timeout = timeout
+        # Optional gh.cache.Cache. Conditional GETs are cached per token since
+        # different tokens can see different things, unless the caller names a
+        # stable scope: a token issued per job (like Actions' GITHUB_TOKEN)
+        # would otherwise never find what an earlier run cached.
+        self.cache = cache
+        self.cache_scope = (
+            cache_scope or hashlib.sha256(str(token).encode()).hexdigest()[:16]
+        )
+        # Called with an event dict after every request; see gh.trace
+        self.hooks = []
         self.issue = gh.Issue(self, working_repo, issue_num)
         self.user = gh.User(self)
         self.repo = gh.Repo(self)
         self.org = gh.Org(self)
         self.enterprise = gh.Enterprise(self)
+
+    # Size the connection pool to the number of threads sharing this client
+    def set_pool_size(self, pool_size):
+        import requests
+
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    # Hooks only observe; a failing hook must not fail the request
+    def notify(self, event):
+        for hook in self.hooks:
+            try:
+                hook(event)
+            except Exception as e:
+                logging.warning(f"Request hook failed: {e}")
+
+    # Every API call made by the resource classes goes through here. GETs asked
+    # to revalidate are answered from the cache when there is one; only callers
+    # that read the same slow-changing resource again opt in, so polls and
+    # one-off lookups don't fill the cache.
+    def request(self, method, url, idempotent=None, revalidate=False, **kwargs):
+        if revalidate and self.cache is not None and method.upper() == "GET":
+            return self.conditional_get(url, **kwargs)
+        return self.send(method, url, idempotent, **kwargs)
+
+    # Follows the Link header, yielding one page of results at a time
+    def paginate(self, url, params=None, revalidate=False):
+        while url:
+            response = self.request("GET", url, params=params, revalidate=revalidate)
+            yield response
+            url = response.links.get("next", {}).get("url")
+            # The next link already carries the query string
+            params = None
+
+    # Makes a call built in gh.calls and returns what it made of the response
+    def call(self, api_call):
+        with trace.expect(*api_call.expect):
+            response = self.request(api_call.method, api_call.url, **api_call.kwargs)
+        return api_call.parse(response)
+
+    # GET with If-None-Match. A 304 doesn't count against the rate limit and is
+    # answered from the cached body.
+    def conditional_get(self, url, **kwargs):
+        import requests
+
+        params = json.dumps(kwargs.get("params"), sort_keys=True)
+        key = f"GET {self.cache_scope} {url} {params}"
+        entry = self.cache.entry(key)
+        headers = dict(kwargs.pop("headers", None) or {})
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+
+        response = self.send("GET", url, headers=headers, **kwargs)
+        if response.status_code == 304 and entry:
+            self.cache.touch(key)
+            cached = requests.Response()
+            cached.status_code = 200
+            cached.url = url
+            cached.headers.update(entry["value"]["headers"])
+            cached._content = entry["value"]["body"].encode()
+            cached.encoding = "utf-8"
+            return cached
+        if response.status_code == 200 and "ETag" in response.headers:
+            value = cache.response_entry(response)
+            self.cache.set(key, value, response.headers["ETag"])
+        return response
+
+    # Sends a request, retrying transient failures. Pass idempotent=True for
+    # POSTs that are safe to repeat.
+    def send(self, method, url, idempotent=None, **kwargs):
+        import requests
+
+        classes = self.scheduler.classify(method, url, kwargs.get("json"))
+        idempotent = self.retry.is_idempotent(method, idempotent)
+        kwargs.setdefault("timeout", self.timeout)
+        start = time.time()
+        waited = 0
+        for attempt in range(self.retry.max_attempts):
+            last_attempt = attempt == self.retry.max_attempts - 1
+            acquired = time.time()
+            self.scheduler.acquire(classes)
+            waited += time.time() - acquired
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.exceptions.RequestException as e:
+                if last_attempt or not self.retry.should_retry_error(e, idempotent):
+                    self.trace(method, url, kwargs, start, waited, attempt, None, e)
+                    raise
+                logging.warning(f"Retrying {method} {url} after error: {e}")
+                time.sleep(self.retry.backoff(attempt))
+                continue
+
+            rate_limited = self.scheduler.update(classes, response)
+            if last_attempt or not self.retry.should_retry_response(
+                response, idempotent, rate_limited
+            ):
+                self.trace(method, url, kwargs, start, waited, attempt, response)
+                return response
+            logging.warning(
+                f"Retrying {method} {url} after response code {response.status_code}"
+            )
+            # Rate limit pauses are applied by the scheduler on the next acquire
+            if not rate_limited:
+                time.sleep(self.retry.backoff(attempt))
+
+    def trace(self, method, url, kwargs, start, waited, attempt, response, error=None):
+        if self.hooks:
+            self.notify(
+                trace.event(
+                    self, method, url, kwargs, start, waited, attempt, response, error
+                )
+            )
@@ -1,10 +1,24 @@
+import json
+import re
+
+# Bump when the manifest layout changes so teardown can tell versions apart
+MANIFEST_VERSION = 1
+
+
 def attendees_to_markdown(attendee_state):
     headers = ["Handle", "Invite Sent?", "Org Name", "Fork Errors"]
     rows = []
     for attendee in attendee_state:
+        if attendee["invited"]:
+            invite = "✅"
+        elif attendee.get("admin"):
+            # Admins have access to every org already and get no invite
+            invite = "Not needed (admin)"
+        else:
+            invite = "❌"
         row = [
             attendee["handle"],
-            "✅" if attendee["invited"] else "❌",
+            invite,
             f"[{attendee['org_name']}](https://github.com/{attendee['org_name']})"
             if attendee["org_name"] is not None
             else "",
@@ -27,7 +41,69 @@ errored = f"""
 Additional information on this error is available in the Actions logs. 
 """
 
+
+# Problems that stopped a bootcamp request before anything was created
+def problems_to_markdown(problems):
+    if not problems:
+        return ""
+    lines = "".join(f"- {problem}\n" for problem in problems)
+    return f"\n### Problems\n\nFix these in the issue and add the `bootcamp::new` label again:\n\n{lines}"
+
+
+# Live status table setup keeps up to date in a single comment while it runs.
+# Rows are rendered one org at a time, so an update only re-renders the orgs
+# that changed.
+STATUS_HEADERS = ["Handle", "Status", "Org Name", "Fork Errors"]
+
+
+def table_row(cells):
+    return f"| {' | '.join(cells)} |"
+
+
+def status_row(handles, status, org_name, fork_errors):
+    return table_row(
+        [
+            ", ".join(handles),
+            status,
+            org_name or "",
+            ", ".join(fork_errors) if fork_errors else "None",
+        ]
+    )
+
+
+def status_to_markdown(rows, ready, total, finished=False):
+    if finished:
+        heading = f"## Provisioning finished\n\n{ready} of {total} orgs ready.\n"
+    else:
+        heading = (
+            f"## Provisioning in progress ⏳\n\n{ready} of {total} orgs ready. "
+            "This comment is updated as orgs finish, so attendees can start "
+            "onboarding as soon as their org is ready.\n"
+        )
+    lines = [
+        heading,
+        table_row(STATUS_HEADERS),
+        table_row(["---"] * len(STATUS_HEADERS)),
+        *rows,
+    ]
+    return "\n".join(lines) + "\n"
+
+
 teardown_complete = f"""
 ## Teardown complete 🗑\n\n
 I've successfully deleted the following orgs.  REMINDER: It takes 90 days for these org names to be available again.\n\n
 """
+
+
+# Machine-readable record of what setup created, hidden in the results comment
+def manifest_to_markdown(manifest):
+    data = json.dumps(manifest, separators=(",", ":"))
+    return f"\n<!-- bootcamp-manifest {data} -->\n"
+
+
+# Returns the manifest hidden in a comment body, or None if there isn't one
+def parse_manifest(body):
+    match = re.search(r"<!-- bootcamp-manifest (\{.*?\}) -->", body or "", re.S)
+    if match is None:
+        return None
+    return json.loads(match.group(1))
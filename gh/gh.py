@@ -1,6 +1,27 @@
-import requests
 import logging
-import gh.graphql as graphql
+import random
+import time
+import gh.calls as calls
+
+# The resource classes used with gh.client.Client. Each method makes one of
+# the calls built in gh.calls (or a few, for listings and batches).
+
+
+# Poll check() with exponential backoff and jitter until it returns True.
+# Raises once the overall deadline (in seconds) has passed.
+def wait_until(check, description, timeout=300, initial_delay=1, max_delay=30):
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    while not check():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            e = f"Timed out after {timeout}s waiting for {description}"
+            logging.error(e)
+            raise Exception(e)
+        # Equal jitter keeps concurrent pollers from hitting the API in lockstep
+        time.sleep(min(delay / 2 + random.uniform(0, delay / 2), remaining))
+        delay = min(delay * 2, max_delay)
+    logging.info(f"{description} is ready")
 
 
 class Repo:
@@ -8,32 +29,30 @@ class Repo:
         self.client = client
 
     def fork(self, name_with_owner, org_name):
-        url = f"{self.client.base_url}/repos/{name_with_owner}/forks"
-        # Adding the default_branch_only parameter to the fork request
-        # to avoid forking all branches of the repo and causing hang-ups
-        data = {"organization": org_name, "default_branch_only": True}
-        response = requests.post(url, headers=self.client.headers, json=data)
-        if response.status_code == 202:
-            logging.info(f"Successfully forked {name_with_owner} to {org_name}")
-            return response.json()["full_name"]
-        else:
-            e = f"Error forking repository.  Response: {response.json()}"
-            logging.error(e)
-            raise Exception(e)
+        return self.client.call(calls.repo_fork(self.client, name_with_owner, org_name))
+
+    # Creates a copy of a template repository in org_name. Unlike a fork it can
+    # be created private, so there is no visibility change to follow up with.
+    def create_from_template(self, template, org_name, private=True):
+        return self.client.call(
+            calls.repo_from_template(self.client, template, org_name, private)
+        )
 
     def visibility(self, name_with_owner, visibility):
-        url = f"{self.client.base_url}/repos/{name_with_owner}"
-        data = {"visibility": visibility}
-        response = requests.patch(url, headers=self.client.headers, json=data)
-        if response.status_code == 200:
-            logging.info(
-                f"Successfully set visibility of {name_with_owner} to {visibility}"
-            )
-            return
-        else:
-            e = f"Error setting visibility of repository.  Response: {response.json()}"
-            logging.error(e)
-            raise Exception(e)
+        return self.client.call(
+            calls.repo_visibility(self.client, name_with_owner, visibility)
+        )
+
+    def exists(self, name_with_owner):
+        return self.client.call(calls.repo_exists(self.client, name_with_owner))
+
+    # Forks are created asynchronously, so wait for the repo before touching it
+    def wait_until_ready(self, name_with_owner, timeout=300):
+        wait_until(
+            lambda: self.exists(name_with_owner),
+            f"repository {name_with_owner}",
+            timeout,
+        )
 
 
 class Org:
@@ -41,55 +60,48 @@ class Org:
         self.client = client
 
     def create(self, enterprise_id, org_name, admin_logins, billing_email):
-        variables = {
-            "enterpriseId": enterprise_id,
-            "login": org_name,
-            "profileName": org_name,
-            "adminLogins": admin_logins,
-            "billingEmail": billing_email,
-        }
-        response = requests.post(
-            self.client.graphql_url,
-            headers=self.client.headers,
-            json={"query": graphql.create_org, "variables": variables},
+        created = self.client.call(
+            calls.org_create(
+                self.client, enterprise_id, org_name, admin_logins, billing_email
+            )
+        )
+        if created:
+            return created
+        return calls.org_reuse(self.get(org_name), org_name)
+
+    def get(self, org_name):
+        return self.client.call(calls.org_get(self.client, org_name))
+
+    # Which of the logins are taken, looked up in batches. A login is taken
+    # if a user or an org has it, unless it is an org we administer listed in
+    # reusable; create() reuses those.
+    def get_taken(self, logins, chunk_size=50, reusable=()):
+        taken = []
+        for start in range(0, len(logins), chunk_size):
+            chunk = logins[start : start + chunk_size]
+            taken += self.client.call(calls.org_taken(self.client, chunk, reusable))
+        return taken
+
+    def exists(self, org_name):
+        return self.client.call(calls.org_exists(self.client, org_name))
+
+    # New orgs take a moment to become visible to the REST API
+    def wait_until_ready(self, org_name, timeout=300):
+        wait_until(lambda: self.exists(org_name), f"organization {org_name}", timeout)
+
+    # Org deletion is asynchronous; the 202 only means it has been queued
+    def wait_until_deleted(self, org_name, timeout=300):
+        wait_until(
+            lambda: not self.exists(org_name),
+            f"deletion of organization {org_name}",
+            timeout,
         )
-        if response.status_code == 200 and "errors" not in response.json():
-            id = response.json()["data"]["createEnterpriseOrganization"][
-                "organization"
-            ]["id"]
-            name = response.json()["data"]["createEnterpriseOrganization"][
-                "organization"
-            ]["name"]
-            logging.info(f"Successfully created organization: {name}")
-            return id, name
-        else:
-            e = f"Error creating organization: {org_name} Response code: {response.status_code} Response: {response.json()}"
-            logging.error(e)
-            raise Exception(e)
 
     def invite_member(self, user_id, org_name):
-        url = f"{self.client.base_url}/orgs/{org_name}/invitations"
-        data = {"invitee_id": user_id, "role": "admin"}
-
-        response = requests.post(url, headers=self.client.headers, json=data)
-        if response.status_code == 201:
-            logging.info(f"Successfully invited {user_id} to {org_name}")
-            return
-        else:
-            e = f"Error inviting user to organization. Response: {response.json()}"
-            logging.error(e)
-            raise Exception(e)
+        return self.client.call(calls.org_invite(self.client, user_id, org_name))
 
     def delete(self, org_name):
-        url = f"{self.client.base_url}/orgs/{org_name}"
-        response = requests.delete(url, headers=self.client.headers)
-        if response.status_code == 202:
-            logging.info(f"Successfully deleted organization: {org_name}")
-            return
-        else:
-            e = f"Error deleting organization: {org_name}. Response: {response.json()}"
-            logging.error(e)
-            raise Exception(e)
+        return self.client.call(calls.org_delete(self.client, org_name))
 
 
 class Enterprise:
@@ -97,20 +109,21 @@ class Enterprise:
         self.client = client
 
     def get_id(self, enterprise_slug):
-        variables = {"slug": enterprise_slug}
-        response = requests.post(
-            self.client.graphql_url,
-            headers=self.client.headers,
-            json={"query": graphql.get_ent_id, "variables": variables},
-        )
-        if response.status_code == 200:
-            id = response.json()["data"]["enterprise"]["id"]
-            logging.info(f"Successfully got enterprise id: {id}")
+        id = calls.cached_enterprise_id(self.client, enterprise_slug)
+        if id:
             return id
-        else:
-            e = f"Error getting enterprise id: {response.json()}"
-            logging.error(e)
-            raise Exception(e)
+        return self.client.call(calls.enterprise_id(self.client, enterprise_slug))
+
+    # Lazily yields the login of every org in the enterprise, 100 per call
+    def get_org_logins(self, enterprise_slug):
+        cursor = None
+        while True:
+            logins, cursor = self.client.call(
+                calls.enterprise_orgs(self.client, enterprise_slug, cursor)
+            )
+            yield from logins
+            if cursor is None:
+                return
 
 
 class Issue:
@@ -122,79 +135,41 @@ class Issue:
             self.issue_num = issue_num
 
     def get(self, labels=None):
-        if labels:
-            url = f"{self.client.base_url}/repos/{self.working_repo}/issues?labels={labels}"
-        else:
-            url = f"{self.client.base_url}/repos/{self.working_repo}/issues/{self.issue_num}"
-        response = requests.get(url, headers=self.client.headers)
-        if response.status_code == 200:
-            logging.info(f"Successfully got issue: {self.issue_num}")
-            return response.json()
-        else:
-            e = f"Error getting issue: {response.json()}"
-            logging.error(e)
-            raise Exception(e)
+        return self.client.call(calls.issue_get(self, labels))
+
+    # Lazily pages through the repo's issues, oldest first, skipping pull requests
+    def get_all(self, labels=None, state="open"):
+        listing = calls.issue_list(self, labels, state)
+        for response in self.client.paginate(listing.url, **listing.kwargs):
+            yield from listing.parse(response)
 
     def apply_label(self, label):
-        url = f"{self.client.base_url}/repos/{self.working_repo}/issues/{self.issue_num}/labels"
-        response = requests.post(url, headers=self.client.headers, json=[label])
-        if response.status_code == 200:
-            logging.info(
-                f"Successfully applied label {label} to issue {self.issue_num}"
-            )
-        else:
-            e = f"Error applying label {label} to issue {self.issue_num}: {response.json()}"
-            logging.error(e)
-            raise Exception(e)
+        return self.client.call(calls.issue_apply_label(self, label))
 
     def remove_label(self, label):
-        url = f"{self.client.base_url}/repos/{self.working_repo}/issues/{self.issue_num}/labels/{label}"
-        response = requests.delete(url, headers=self.client.headers)
-        if response.status_code == 200:
-            logging.info(
-                f"Successfully removed label {label} from issue {self.issue_num}"
-            )
-        else:
-            e = f"Error removing label {label} from issue {self.issue_num}: {response.json()}"
-            logging.error(e)
-            raise Exception(e)
+        return self.client.call(calls.issue_remove_label(self, label))
 
     def add_comment(self, comment):
-        url = f"{self.client.base_url}/repos/{self.working_repo}/issues/{self.issue_num}/comments"
-        response = requests.post(
-            url, headers=self.client.headers, json={"body": comment}
-        )
-        if response.status_code == 201:
-            logging.info(f"Successfully added comment to issue {self.issue_num}")
-        else:
-            e = f"Error adding comment to issue {self.issue_num}: {response.json()}"
-            logging.error(e)
-            raise Exception(e)
+        return self.client.call(calls.issue_add_comment(self, comment))
+
+    # Replaces the body of a comment, e.g. one made by add_comment
+    def edit_comment(self, comment_id, comment):
+        return self.client.call(calls.issue_edit_comment(self, comment_id, comment))
 
+    # Lazily yields every comment on the issue, one page at a time. With a
+    # cache on the client, unchanged pages are revalidated for free.
     def get_comments(self):
-        url = f"{self.client.base_url}/repos/{self.working_repo}/issues/{self.issue_num}/comments"
-        response = requests.get(url, headers=self.client.headers)
-        if response.status_code == 200:
-            logging.info(f"Successfully got comments for issue: {self.issue_num}")
-            return response.json()
-        else:
-            e = f"Error getting comments for issue: {response.json()}"
-            logging.error(e)
-            raise Exception(e)
+        listing = calls.issue_comments(self)
+        for response in self.client.paginate(listing.url, **listing.kwargs):
+            yield from listing.parse(response)
+        logging.info(f"Successfully got comments for issue: {self.issue_num}")
+
+    # The last few comments in a single GraphQL call, oldest first
+    def get_recent_comments(self, count=20):
+        return self.client.call(calls.issue_recent_comments(self, count))
 
     def close(self):
-        url = (
-            f"{self.client.base_url}/repos/{self.working_repo}/issues/{self.issue_num}"
-        )
-        response = requests.patch(
-            url, headers=self.client.headers, json={"state": "closed"}
-        )
-        if response.status_code == 200:
-            logging.info(f"Successfully closed issue {self.issue_num}")
-        else:
-            e = f"Error closing issue {self.issue_num}: {response.json()}"
-            logging.error(e)
-            raise Exception(e)
+        return self.client.call(calls.issue_close(self))
 
 
 class User:
@@ -202,17 +177,17 @@ class User:
         self.client = client
 
     def get_id(self, username):
-        url = f"{self.client.base_url}/users/{username}"
-        response = requests.get(url, headers=self.client.headers)
-        if response.status_code == 200:
-            id = response.json()["id"]
-            logging.info(f"{username} ID: {id}")
-            return id
-        elif response.status_code == 404:
-            e = f"User {username} does not exist"
-            logging.error(e)
-            raise Exception(e)
-        else:
-            e = f"Error getting user id: {response.json()}"
-            logging.error(e)
-            raise Exception(e)
+        return self.client.call(calls.user_id(self.client, username))
+
+    # Resolve many handles in a few GraphQL round trips. Returns a dict of
+    # handle -> id for the users that exist and a list of handles that don't.
+    def get_ids(self, usernames, chunk_size=50):
+        ids = calls.cached_user_ids(self.client, usernames)
+        not_found = []
+        usernames = [username for username in usernames if username not in ids]
+        for start in range(0, len(usernames), chunk_size):
+            chunk = usernames[start : start + chunk_size]
+            found, missing = self.client.call(calls.user_ids(self.client, chunk))
+            ids.update(found)
+            not_found += missing
+        return ids, not_found
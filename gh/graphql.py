@@ -16,3 +16,72 @@ mutation createEnterpriseOrganization($adminLogins: [String!]!, $billingEmail: S
   }
 }
 """
+
+get_org = """
+query organization ($login: String!){
+  organization (login:$login) {
+    id
+    login
+    name
+    viewerCanAdminister
+  }
+}
+"""
+
+get_recent_comments = """
+query recentComments ($owner: String!, $name: String!, $number: Int!, $count: Int!){
+  repository (owner:$owner, name:$name) {
+    issue (number:$number) {
+      comments (last:$count) {
+        nodes {
+          body
+          author {
+            login
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+
+get_ent_orgs = """
+query enterpriseOrganizations ($slug: String!, $cursor: String){
+  enterprise (slug:$slug) {
+    organizations (first:100, after:$cursor) {
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
+      nodes {
+        login
+      }
+    }
+  }
+}
+"""
+
+
+# Builds one query that looks up several users at once. Each login is passed
+# as its own variable ($u0, $u1, ...) and aliased the same way in the result.
+def get_users(count):
+    variables = ", ".join(f"$u{i}: String!" for i in range(count))
+    fields = "\n".join(
+        f"  u{i}: user (login:$u{i}) {{\n    login\n    databaseId\n  }}"
+        for i in range(count)
+    )
+    return f"query users ({variables}){{\n{fields}\n}}\n"
+
+
+# Builds one query that looks up several owner logins at once. Users and orgs
+# share one namespace, so a login is taken if either has it. Aliased like
+# get_users, with $o0, $o1, ...
+def get_owners(count):
+    variables = ", ".join(f"$o{i}: String!" for i in range(count))
+    fields = "\n".join(
+        f"  o{i}: repositoryOwner (login:$o{i}) {{\n    login\n"
+        f"    ... on Organization {{\n      viewerCanAdminister\n    }}\n  }}"
+        for i in range(count)
+    )
+    return f"query owners ({variables}){{\n{fields}\n}}\n"
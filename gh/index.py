@@ -0,0 +1,167 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+
+# Local SQLite index of the orgs each bootcamp created. Setup adds to it from
+# the manifest, teardown answers "which orgs belong to issue N" from it, and a
+# single paged enterprise org listing keeps it honest.
+class OrgIndex:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS bootcamps (
+                issue INTEGER PRIMARY KEY,
+                bootcamp_date TEXT,
+                org_prefix TEXT,
+                hold INTEGER DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS orgs (
+                org_name TEXT PRIMARY KEY COLLATE NOCASE,
+                issue INTEGER,
+                handle TEXT,
+                role TEXT,
+                alive INTEGER DEFAULT 1,
+                checked_at REAL,
+                deleted_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS orgs_by_issue ON orgs (issue);
+            """)
+        # Indexes written before deleted_at existed: the last check of a dead
+        # org is the best guess of when it was deleted
+        columns = [row[1] for row in self.db.execute("PRAGMA table_info(orgs)")]
+        if "deleted_at" not in columns:
+            self.db.execute("ALTER TABLE orgs ADD COLUMN deleted_at REAL")
+            self.db.execute("UPDATE orgs SET deleted_at = checked_at WHERE alive = 0")
+        self.db.commit()
+
+    def add_manifest(self, manifest):
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO bootcamps (issue, bootcamp_date, org_prefix) "
+                "VALUES (?, ?, ?)",
+                (manifest["issue"], manifest["bootcamp_date"], manifest["org_prefix"]),
+            )
+            self.db.executemany(
+                "INSERT OR REPLACE INTO orgs "
+                "(org_name, issue, handle, role, alive, checked_at, deleted_at) "
+                "VALUES (?, ?, ?, ?, 1, ?, NULL)",
+                [
+                    (
+                        org["org_name"],
+                        manifest["issue"],
+                        org["handle"],
+                        org["role"],
+                        time.time(),
+                    )
+                    for org in manifest["orgs"]
+                ],
+            )
+            self.db.commit()
+        logging.info(
+            f"Indexed {len(manifest['orgs'])} orgs for issue {manifest['issue']}"
+        )
+
+    # Orgs for an issue that are still alive, or None if the issue isn't indexed
+    def org_names(self, issue):
+        with self.lock:
+            known = self.db.execute(
+                "SELECT 1 FROM bootcamps WHERE issue = ?", (int(issue),)
+            ).fetchone()
+            rows = self.db.execute(
+                "SELECT org_name FROM orgs WHERE issue = ? AND alive = 1",
+                (int(issue),),
+            ).fetchall()
+        if known is None:
+            return None
+        return [row[0] for row in rows]
+
+    # deleted_at is only set when an org goes from alive to deleted, so
+    # later checks don't move it
+    def mark_deleted(self, org_names):
+        now = time.time()
+        with self.lock:
+            self.db.executemany(
+                "UPDATE orgs SET alive = 0, checked_at = ?, "
+                "deleted_at = COALESCE(deleted_at, ?) WHERE org_name = ?",
+                [(now, now, org_name) for org_name in org_names],
+            )
+            self.db.commit()
+
+    # Live orgs that belong to a different bootcamp. The admin token
+    # administers them all, so setup must not plan them for this issue.
+    def claimed(self, issue):
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT org_name FROM orgs WHERE alive = 1 AND issue != ?",
+                (int(issue),),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    # Orgs deleted in the last few days. GitHub holds the name of a deleted
+    # org for 90 days, so setup doesn't plan to reuse these.
+    def recently_deleted(self, days=90):
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT org_name FROM orgs WHERE alive = 0 AND deleted_at > ?",
+                (time.time() - days * 86400,),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    # Holds are labels, so the sweep's issue listing is what decides them;
+    # the index keeps a copy for the per-bootcamp audit in alive()
+    def set_hold(self, issue, hold):
+        with self.lock:
+            self.db.execute(
+                "UPDATE bootcamps SET hold = ? WHERE issue = ?",
+                (int(hold), int(issue)),
+            )
+            self.db.commit()
+
+    # Count of live orgs per indexed bootcamp, for audit logging
+    def alive(self):
+        with self.lock:
+            return self.db.execute(
+                "SELECT b.issue, b.bootcamp_date, b.hold, COUNT(o.org_name) "
+                "FROM bootcamps b JOIN orgs o ON o.issue = b.issue AND o.alive = 1 "
+                "GROUP BY b.issue ORDER BY b.issue"
+            ).fetchall()
+
+    # Bring the index in line with the orgs that actually exist in the
+    # enterprise. Returns live orgs with the prefix that aren't indexed.
+    def reconcile(self, live_org_names, org_prefix):
+        live_org_names = list(live_org_names)
+        live = {org_name.lower() for org_name in live_org_names}
+        with self.lock:
+            rows = self.db.execute("SELECT org_name, alive FROM orgs").fetchall()
+            indexed = {row[0].lower() for row in rows}
+            now = time.time()
+            # An org that is alive has no deletion time; one that has gone keeps
+            # the time it was first seen gone
+            updates = []
+            for row in rows:
+                alive = int(row[0].lower() in live)
+                updates.append((alive, now, alive, now, row[0]))
+            self.db.executemany(
+                "UPDATE orgs SET alive = ?, checked_at = ?, deleted_at = "
+                "CASE WHEN ? THEN NULL ELSE COALESCE(deleted_at, ?) END "
+                "WHERE org_name = ?",
+                updates,
+            )
+            self.db.commit()
+        orphans = sorted(
+            org_name
+            for org_name in live_org_names
+            if org_name.lower().startswith(org_prefix.lower() + "-")
+            and org_name.lower() not in indexed
+        )
+        logging.info(
+            f"Reconciled {len(rows)} indexed orgs against {len(live)} enterprise orgs"
+        )
+        return orphans
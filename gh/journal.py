@@ -0,0 +1,113 @@
+import json
+import logging
+import os
+import threading
+
+
+# Append-only record of completed setup steps. Each step is written and
+# flushed as soon as it finishes, so an interrupted run can be resumed by
+# replaying the file and skipping whatever is already done.
+#
+# inputs is whatever the steps depend on besides the handles (the bootcamp
+# date, org prefix and repos). It is recorded first, and a journal recorded
+# for different inputs is discarded rather than resumed, since its orgs and
+# forks were made for a different bootcamp. So is a finished one: its orgs may
+# have been torn down since.
+class Journal:
+    def __init__(self, path, resume=False, inputs=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = []
+        resume = resume and os.path.exists(path)
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if resume:
+            with open(path, "r") as stream:
+                for line in stream:
+                    # The last line may be cut off if the run was killed mid-write
+                    try:
+                        self.entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        logging.warning(f"Skipping damaged journal line: {line}")
+            # Compared as JSON, the way they were recorded
+            inputs = json.loads(json.dumps(inputs))
+            recorded = [entry for entry in self.entries if entry["step"] == "inputs"]
+            if inputs is not None and (
+                not recorded or recorded[-1]["inputs"] != inputs
+            ):
+                logging.info("Journal was recorded for different inputs, starting over")
+                self.entries = []
+                resume = False
+            elif any(entry["step"] == "finished" for entry in self.entries):
+                logging.info("Journal is for a finished run, starting over")
+                self.entries = []
+                resume = False
+            else:
+                logging.info(f"Resuming from {len(self.entries)} journal entries")
+        self.file = open(path, "a" if resume else "w")
+        self.completed = {self.key(**entry) for entry in self.entries}
+        # Called with every new entry, e.g. to report progress as steps finish
+        self.listeners = []
+        if inputs is not None and not resume:
+            self.record("inputs", inputs=inputs)
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def key(self, step, handle=None, repo=None, **fields):
+        return (step, handle, repo)
+
+    def record(self, step, handle=None, repo=None, **fields):
+        entry = {"step": step, "handle": handle, "repo": repo, **fields}
+        with self.lock:
+            self.file.write(json.dumps(entry) + "\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.entries.append(entry)
+            self.completed.add(self.key(**entry))
+        for listener in self.listeners:
+            listener(entry)
+
+    def done(self, step, handle=None, repo=None):
+        return (step, handle, repo) in self.completed
+
+    # Returns a previously recorded attendee list with the progress made on it
+    # applied, or None if there is none for exactly these handles
+    def load_state(self, name, handles):
+        saved = [
+            entry
+            for entry in self.entries
+            if entry["step"] == "state" and entry["name"] == name
+        ]
+        if not saved or [a["handle"] for a in saved[-1]["state"]] != handles:
+            return None
+        state = saved[-1]["state"]
+        for attendee in state:
+            for entry in self.entries:
+                if entry["handle"] != attendee["handle"]:
+                    continue
+                if entry["step"] == "org_created":
+                    attendee.update(
+                        {"org_id": entry["org_id"], "org_name": entry["org_name"]}
+                    )
+                elif entry["step"] == "invited":
+                    attendee["invited"] = True
+        return state
+
+    # Names of the orgs this journal recorded creating
+    def created_orgs(self):
+        return [
+            entry["org_name"]
+            for entry in self.entries
+            if entry["step"] == "org_created"
+        ]
+
+    def save_state(self, name, state):
+        self.record("state", name=name, state=state)
+
+    # Marks the run as complete, so it is never resumed
+    def finish(self):
+        self.record("finished")
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,70 @@
+import hashlib
+import logging
+from gh import validate
+
+# Plans the org names of a cohort before anything is created. Each handle
+# gets <prefix>-<date>-<handle> if that is a valid login, free, and no other
+# handle in the cohort would get it too. Otherwise it gets a name shortened
+# to fit with a suffix hashed from the handle, so the same request always
+# plans the same names.
+
+SUFFIX_LENGTH = 6
+
+# Alternatives tried per handle before giving up
+MAX_CANDIDATES = 5
+
+
+# The names to try for a handle, in order
+def candidates(prefix, bootcamp_date, handle):
+    name = f"{prefix}-{bootcamp_date}-{handle}"
+    if validate.valid_login(name):
+        yield name
+    stem = name[: validate.LOGIN_LENGTH - SUFFIX_LENGTH - 1].rstrip("-")
+    for attempt in range(MAX_CANDIDATES):
+        seed = handle.lower() if attempt == 0 else f"{handle.lower()}:{attempt}"
+        suffix = hashlib.sha1(seed.encode()).hexdigest()[:SUFFIX_LENGTH]
+        yield f"{stem}-{suffix}"
+
+
+# Picks a name for every handle. get_taken(names) returns the names someone
+# else already has and is called once per round with all of that round's
+# names; reserved names (deleted recently, so still held by GitHub) are
+# never used. Returns the names by lowercase handle.
+def plan(handles, prefix, bootcamp_date, get_taken, reserved=()):
+    reserved = {name.lower() for name in reserved}
+    options = {
+        handle.lower(): candidates(prefix, bootcamp_date, handle) for handle in handles
+    }
+    names = {}
+    pending = list(options)
+    while pending:
+        proposed = {}
+        for handle in pending:
+            name = next(options[handle], None)
+            if name is None:
+                e = f"No free org name for {handle}"
+                logging.error(e)
+                raise Exception(e)
+            proposed[handle] = name
+
+        # A name two handles would share goes to neither of them
+        counts = {}
+        for name in proposed.values():
+            counts[name.lower()] = counts.get(name.lower(), 0) + 1
+        unavailable = {name.lower() for name in names.values()} | reserved
+        to_check = [
+            name
+            for name in proposed.values()
+            if counts[name.lower()] == 1 and name.lower() not in unavailable
+        ]
+        if to_check:
+            unavailable |= {name.lower() for name in get_taken(to_check)}
+
+        pending = []
+        for handle, name in proposed.items():
+            if counts[name.lower()] > 1 or name.lower() in unavailable:
+                logging.info(f"Org name {name} is not available for {handle}")
+                pending.append(handle)
+            else:
+                names[handle] = name
+    return names
@@ -0,0 +1,177 @@
+import logging
+import threading
+import time
+from collections import deque
+
+# Endpoint classes with their own budgets
+CORE = "core"
+GRAPHQL = "graphql"
+CONTENT = "content"
+
+# Secondary limits on content-creating requests (POST/PATCH/PUT/DELETE and
+# GraphQL mutations): requests allowed per window, as (count, seconds)
+CONTENT_WINDOWS = [(80, 60), (500, 3600)]
+
+# Start spreading requests out once the primary budget drops below this share
+LOW_WATER = 0.1
+
+# Pause used for a secondary limit hit that doesn't say how long to wait
+SECONDARY_PAUSE = 60
+
+
+# Tracks the primary rate limit reported in the X-RateLimit-* headers
+class Budget:
+    def __init__(self, name):
+        self.name = name
+        self.limit = None
+        self.remaining = None
+        self.reset = 0
+        self.next_slot = 0
+
+    # Returns the time at which the next request may be sent
+    def reserve(self, now):
+        if self.remaining is None or now >= self.reset:
+            # Unknown or expired window; the next response tells us where we stand
+            self.remaining = None
+            return now
+        if self.remaining <= 0:
+            return self.reset
+        start = now
+        if self.remaining < self.limit * LOW_WATER:
+            # Spread what's left evenly over the rest of the window
+            start = max(now, self.next_slot)
+            self.next_slot = start + (self.reset - now) / self.remaining
+        self.remaining -= 1
+        return start
+
+    def update(self, headers):
+        if "X-RateLimit-Remaining" not in headers:
+            return
+        self.limit = int(headers.get("X-RateLimit-Limit", 0)) or None
+        self.remaining = int(headers["X-RateLimit-Remaining"])
+        self.reset = int(headers.get("X-RateLimit-Reset", 0))
+        if self.limit is None:
+            self.remaining = None
+
+
+# Sliding-window budget for content-creating requests. The allowance of the
+# first (shortest) window shrinks when GitHub reports a secondary limit and
+# recovers gradually on success (additive increase, multiplicative decrease).
+class ContentBudget:
+    def __init__(self, windows=CONTENT_WINDOWS):
+        self.windows = windows
+        # No windows means no secondary limit (e.g. a local simulator)
+        self.allowance = windows[0][0] if windows else 0
+        self.sent = deque(maxlen=max([count for count, _ in windows], default=0))
+
+    def earliest(self, now):
+        start = now
+        for i, (count, seconds) in enumerate(self.windows):
+            if i == 0:
+                count = int(self.allowance)
+            if len(self.sent) >= count:
+                start = max(start, self.sent[-count] + seconds)
+        return start
+
+    def record(self, start):
+        if self.sent:
+            start = max(start, self.sent[-1])
+        self.sent.append(start)
+
+    def throttle(self):
+        if not self.windows:
+            return
+        self.allowance = max(1, self.allowance / 2)
+        logging.warning(
+            f"Secondary rate limit hit, pacing content requests at {int(self.allowance)} per {self.windows[0][1]}s"
+        )
+
+    def recover(self):
+        if not self.windows:
+            return
+        self.allowance = min(self.windows[0][0], self.allowance + 0.5)
+
+
+# Paces requests so a client runs as fast as its rate limits allow
+class Scheduler:
+    def __init__(self, graphql_url):
+        self.graphql_url = graphql_url
+        self.lock = threading.Lock()
+        self.budgets = {CORE: Budget(CORE), GRAPHQL: Budget(GRAPHQL)}
+        self.content = ContentBudget()
+        self.paused_until = 0
+
+    # Replaces the secondary limit windows, as a list of (count, seconds)
+    def set_content_windows(self, windows):
+        with self.lock:
+            self.content = ContentBudget([tuple(window) for window in windows])
+
+    def classify(self, method, url, body=None):
+        if url == self.graphql_url:
+            query = (body or {}).get("query", "")
+            if query.lstrip().startswith("mutation"):
+                return [GRAPHQL, CONTENT]
+            return [GRAPHQL]
+        if method.upper() in ("POST", "PATCH", "PUT", "DELETE"):
+            return [CORE, CONTENT]
+        return [CORE]
+
+    # Blocks until every budget the request draws on has room for it
+    def acquire(self, classes):
+        wait = self.reserve(classes)
+        if wait > 0:
+            time.sleep(wait)
+
+    # Books a slot for the request and returns how many seconds to wait for
+    # it. Never blocks, so async callers can sleep without holding up the loop.
+    def reserve(self, classes):
+        with self.lock:
+            now = time.time()
+            start = max(now, self.paused_until)
+            for name in classes:
+                if name == CONTENT:
+                    start = max(start, self.content.earliest(now))
+                else:
+                    start = max(start, self.budgets[name].reserve(now))
+            if CONTENT in classes:
+                self.content.record(start)
+        wait = start - time.time()
+        if wait > 1:
+            logging.info(f"Rate limit pacing: waiting {wait:.1f}s")
+        return wait
+
+    # Records the budgets reported by a response. Returns True if the request
+    # was rejected by a rate limit.
+    def update(self, classes, response):
+        with self.lock:
+            resource = response.headers.get("X-RateLimit-Resource")
+            if resource in self.budgets:
+                self.budgets[resource].update(response.headers)
+            if response.status_code in (403, 429):
+                return self.pause(response)
+            if CONTENT in classes and response.status_code < 400:
+                self.content.recover()
+            return False
+
+    def pause(self, response):
+        now = time.time()
+        # Concurrent requests often trip the same limit; only back off once
+        already_paused = self.paused_until > now
+        if "Retry-After" in response.headers:
+            self.paused_until = max(
+                self.paused_until, now + int(response.headers["Retry-After"])
+            )
+        elif response.headers.get("X-RateLimit-Remaining") == "0":
+            self.paused_until = max(
+                self.paused_until, int(response.headers["X-RateLimit-Reset"])
+            )
+        elif "secondary rate limit" in response.text.lower():
+            self.paused_until = max(self.paused_until, now + SECONDARY_PAUSE)
+        else:
+            return False
+        if not already_paused:
+            self.content.throttle()
+        logging.warning(
+            f"Rate limited, pausing requests for {self.paused_until - now:.0f}s"
+        )
+        return True
@@ -0,0 +1,66 @@
+import random
+
+# Server errors worth another attempt
+RETRY_STATUSES = (500, 502, 503, 504)
+
+# Methods that are safe to repeat. POSTs are only retried when the caller
+# marks them idempotent, i.e. it treats "already exists" as success.
+IDEMPOTENT_METHODS = ("GET", "HEAD", "PUT", "PATCH", "DELETE")
+
+
+# Transport errors raised by requests; the async client passes httpx's.
+# Looked up when a policy is made, so importing this module doesn't load requests.
+def requests_errors():
+    import requests
+
+    return (requests.exceptions.ConnectTimeout,), (
+        requests.exceptions.Timeout,
+        requests.exceptions.ConnectionError,
+    )
+
+
+# Decides whether a failed request should be retried and how long to wait
+class RetryPolicy:
+    def __init__(
+        self,
+        max_attempts=5,
+        base_delay=1,
+        max_delay=60,
+        connect_timeouts=None,
+        transport_errors=None,
+    ):
+        if connect_timeouts is None or transport_errors is None:
+            default_connect_timeouts, default_transport_errors = requests_errors()
+            connect_timeouts = connect_timeouts or default_connect_timeouts
+            transport_errors = transport_errors or default_transport_errors
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.connect_timeouts = connect_timeouts
+        self.transport_errors = transport_errors
+
+    def is_idempotent(self, method, idempotent=None):
+        if idempotent is not None:
+            return idempotent
+        return method.upper() in IDEMPOTENT_METHODS
+
+    # Capped exponential backoff with jitter
+    def backoff(self, attempt):
+        delay = min(self.max_delay, self.base_delay * 2**attempt)
+        return random.uniform(delay / 2, delay)
+
+    def should_retry_error(self, error, idempotent):
+        # A connect timeout means the request never reached GitHub
+        if isinstance(error, self.connect_timeouts):
+            return True
+        if isinstance(error, self.transport_errors):
+            return idempotent
+        return False
+
+    def should_retry_response(self, response, idempotent, rate_limited):
+        # Rate limited requests were rejected before doing any work
+        if rate_limited:
+            return True
+        if response.status_code in RETRY_STATUSES:
+            return idempotent
+        return False
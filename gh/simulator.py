@@ -0,0 +1,641 @@
+import argparse
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlparse
+from gh import setup_logging
+
+# Local stand-in for the parts of the GitHub API the bootcamp scripts use, for
+# dry runs and benchmarks. Point the clients at it with GITHUB_API_URL and
+# GITHUB_GRAPHQL_URL. Latency, async fork/org delays, rate limits and injected
+# errors are all configurable.
+#
+#   python -m gh.simulator --port 8000 --latency 0.05 --fork-delay 2
+
+SECONDARY_LIMIT_MESSAGE = "You have exceeded a secondary rate limit. Please wait a few minutes before you try again."
+
+
+class Simulator:
+    def __init__(
+        self,
+        latency=0.0,
+        fork_delay=0.0,
+        org_delay=0.0,
+        delete_delay=0.0,
+        rate_limit=5000,
+        rate_window=3600,
+        content_per_minute=None,
+        retry_after=60,
+        error_rate=0.0,
+        missing_users=(),
+        taken=(),
+        seed=0,
+    ):
+        self.latency = latency
+        self.fork_delay = fork_delay
+        self.org_delay = org_delay
+        self.delete_delay = delete_delay
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.content_per_minute = content_per_minute
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.missing_users = {user.lower() for user in missing_users}
+        # Logins someone else owns, so setup can't create orgs with them
+        self.taken = {login.lower() for login in taken}
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.orgs = {}
+        self.repos = {}
+        self.issues = {}
+        self.comment_id = 0
+        self.budgets = {}
+        self.content_sent = deque()
+        self.server = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self.lock:
+            self.started = time.time()
+            self.stats = {
+                "requests": 0,
+                "by_endpoint": Counter(),
+                "by_status": Counter(),
+                "invites": [],
+                "in_flight": 0,
+                "max_in_flight": 0,
+            }
+
+    def snapshot(self):
+        with self.lock:
+            invites = sorted(self.stats["invites"])
+            return {
+                "requests": self.stats["requests"],
+                "by_endpoint": dict(self.stats["by_endpoint"]),
+                "by_status": {str(k): v for k, v in self.stats["by_status"].items()},
+                "invites": len(invites),
+                "first_invite": invites[0] if invites else None,
+                "max_in_flight": self.stats["max_in_flight"],
+                "live_orgs": sum(1 for org in self.orgs.values() if self.is_live(org)),
+            }
+
+    def add_issue(self, repo, number, body, labels=(), created_at=None):
+        with self.lock:
+            self.issues[(repo.lower(), int(number))] = {
+                "number": int(number),
+                "title": "GHAS bootcamp request",
+                "body": body,
+                "state": "open",
+                "labels": [{"name": label} for label in labels],
+                "created_at": created_at
+                or time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "comments": [],
+            }
+
+    def start(self, port=0):
+        simulator = self
+
+        class Handler(RequestHandler):
+            pass
+
+        Handler.simulator = simulator
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+    # Returns (status, body, headers) for one request
+    def handle(self, method, url, headers, body):
+        parsed = urlparse(url)
+        query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+        route, handler, args = self.route(method, parsed.path)
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["by_endpoint"][f"{method} {route}"] += 1
+            self.stats["in_flight"] += 1
+            self.stats["max_in_flight"] = max(
+                self.stats["max_in_flight"], self.stats["in_flight"]
+            )
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            status, payload, extra = self.dispatch(
+                method, route, handler, args, query, headers, body
+            )
+        finally:
+            with self.lock:
+                self.stats["in_flight"] -= 1
+        with self.lock:
+            self.stats["by_status"][status] += 1
+        return status, payload, extra
+
+    def route(self, method, path):
+        path = path.rstrip("/")
+        for route_method, pattern, name in ROUTES:
+            match = re.fullmatch(pattern, path)
+            if route_method == method and match:
+                return name, getattr(self, name), match.groups()
+        return "unknown", None, ()
+
+    def dispatch(self, method, route, handler, args, query, headers, body):
+        if handler is None:
+            return 404, {"message": "Not Found"}, {}
+        if route == "snapshot":
+            return 200, self.snapshot(), {}
+        token = headers.get("Authorization", "")
+        resource = "graphql" if route == "graphql" else "core"
+        content = method != "GET" and not (
+            route == "graphql"
+            and not body.get("query", "").lstrip().startswith("mutation")
+        )
+        with self.lock:
+            limit_headers = self.spend(token, resource)
+            if limit_headers["X-RateLimit-Remaining"] == "-1":
+                limit_headers["X-RateLimit-Remaining"] = "0"
+                return 403, {"message": "API rate limit exceeded"}, limit_headers
+            if content and self.secondary_limited():
+                return (
+                    403,
+                    {"message": SECONDARY_LIMIT_MESSAGE},
+                    {**limit_headers, "Retry-After": str(self.retry_after)},
+                )
+            if self.error_rate and self.random.random() < self.error_rate:
+                return 502, {"message": "Server Error"}, limit_headers
+            status, payload = handler(*args, query=query, body=body)
+        extra = dict(limit_headers)
+        if isinstance(payload, Page):
+            extra.update(payload.link(headers.get("Host"), route_path(args, route)))
+            payload = payload.items
+        if method == "GET" and status == 200:
+            etag = '"' + hashlib.sha1(json.dumps(payload).encode()).hexdigest() + '"'
+            extra["ETag"] = etag
+            if headers.get("If-None-Match") == etag:
+                # Conditional hits don't count against the rate limit
+                with self.lock:
+                    self.budgets[(token, resource)]["remaining"] += 1
+                return 304, None, extra
+        return status, payload, extra
+
+    def spend(self, token, resource):
+        now = time.time()
+        budget = self.budgets.get((token, resource))
+        if budget is None or now >= budget["reset"]:
+            budget = {"remaining": self.rate_limit, "reset": now + self.rate_window}
+            self.budgets[(token, resource)] = budget
+        budget["remaining"] -= 1
+        return {
+            "X-RateLimit-Limit": str(self.rate_limit),
+            "X-RateLimit-Remaining": str(max(budget["remaining"], -1)),
+            "X-RateLimit-Reset": str(int(budget["reset"])),
+            "X-RateLimit-Resource": resource,
+        }
+
+    def secondary_limited(self):
+        if not self.content_per_minute:
+            return False
+        now = time.time()
+        while self.content_sent and self.content_sent[0] < now - 60:
+            self.content_sent.popleft()
+        if len(self.content_sent) >= self.content_per_minute:
+            return True
+        self.content_sent.append(now)
+        return False
+
+    # REST endpoints
+
+    def fork(self, source, query, body):
+        org = self.known_org(body.get("organization"))
+        if org is None:
+            return 422, {"message": "Validation Failed"}
+        full_name = f"{org['login']}/{source.split('/')[1]}"
+        if full_name.lower() not in self.repos:
+            self.repos[full_name.lower()] = {
+                "full_name": full_name,
+                "visibility": "public",
+                "ready_at": time.time() + self.fork_delay,
+            }
+        return 202, {"full_name": full_name}
+
+    def generate(self, template, query, body):
+        org = self.known_org(body.get("owner"))
+        if org is None:
+            return 422, {"message": "Validation Failed"}
+        full_name = f"{org['login']}/{body['name']}"
+        if full_name.lower() in self.repos:
+            return 422, {
+                "message": "Validation Failed",
+                "errors": [{"message": "Name already exists on this account"}],
+            }
+        self.repos[full_name.lower()] = {
+            "full_name": full_name,
+            "visibility": "private" if body.get("private") else "public",
+            "ready_at": time.time() + self.fork_delay,
+        }
+        return 201, {"full_name": full_name}
+
+    def get_repo(self, full_name, query, body):
+        repo = self.live_repo(full_name)
+        if repo is None:
+            return 404, {"message": "Not Found"}
+        return 200, {"full_name": repo["full_name"], "visibility": repo["visibility"]}
+
+    def update_repo(self, full_name, query, body):
+        repo = self.live_repo(full_name)
+        if repo is None:
+            return 404, {"message": "Not Found"}
+        repo["visibility"] = body.get("visibility", repo["visibility"])
+        return 200, {"full_name": repo["full_name"], "visibility": repo["visibility"]}
+
+    def get_org(self, login, query, body):
+        org = self.live_org(login)
+        if org is None:
+            return 404, {"message": "Not Found"}
+        return 200, {"login": org["login"], "id": org["id"]}
+
+    def delete_org(self, login, query, body):
+        org = self.known_org(login)
+        if org is None:
+            return 404, {"message": "Not Found"}
+        org["deleted_at"] = time.time() + self.delete_delay
+        return 202, {}
+
+    def invite(self, login, query, body):
+        org = self.live_org(login)
+        if org is None:
+            return 404, {"message": "Not Found"}
+        if body.get("invitee_id") in org["invitations"]:
+            return 422, {
+                "message": "Validation Failed",
+                "errors": [{"message": "A pending invitation already exists"}],
+            }
+        org["invitations"].add(body.get("invitee_id"))
+        self.stats["invites"].append(time.time() - self.started)
+        return 201, {"id": len(org["invitations"])}
+
+    def get_user(self, login, query, body):
+        if login.lower() in self.missing_users:
+            return 404, {"message": "Not Found"}
+        return 200, {"login": login, "id": user_id(login)}
+
+    def list_issues(self, repo, query, body):
+        issues = [
+            issue
+            for (issue_repo, _), issue in sorted(self.issues.items())
+            if issue_repo == repo.lower()
+            and issue["state"] == query.get("state", "open")
+            and all(
+                label in [l["name"] for l in issue["labels"]]
+                for label in query.get("labels", "").split(",")
+                if label
+            )
+        ]
+        issues.sort(key=lambda issue: issue["created_at"])
+        if query.get("direction") == "desc":
+            issues.reverse()
+        return 200, Page([rest_issue(issue) for issue in issues], query)
+
+    def get_issue(self, repo, number, query, body):
+        issue = self.issues.get((repo.lower(), int(number)))
+        if issue is None:
+            return 404, {"message": "Not Found"}
+        return 200, rest_issue(issue)
+
+    def update_issue(self, repo, number, query, body):
+        issue = self.issues.get((repo.lower(), int(number)))
+        if issue is None:
+            return 404, {"message": "Not Found"}
+        issue["state"] = body.get("state", issue["state"])
+        return 200, rest_issue(issue)
+
+    def add_labels(self, repo, number, query, body):
+        issue = self.issues.get((repo.lower(), int(number)))
+        if issue is None:
+            return 404, {"message": "Not Found"}
+        for label in body:
+            if label not in [l["name"] for l in issue["labels"]]:
+                issue["labels"].append({"name": label})
+        return 200, issue["labels"]
+
+    def remove_label(self, repo, number, label, query, body):
+        issue = self.issues.get((repo.lower(), int(number)))
+        names = [l["name"] for l in issue["labels"]] if issue else []
+        if label not in names:
+            return 404, {"message": "Label does not exist"}
+        issue["labels"] = [l for l in issue["labels"] if l["name"] != label]
+        return 200, issue["labels"]
+
+    def add_comment(self, repo, number, query, body):
+        issue = self.issues.get((repo.lower(), int(number)))
+        if issue is None:
+            return 404, {"message": "Not Found"}
+        self.comment_id += 1
+        comment = {
+            "id": self.comment_id,
+            "user": {"login": "github-actions[bot]"},
+            "body": body["body"],
+        }
+        issue["comments"].append(comment)
+        return 201, comment
+
+    def edit_comment(self, repo, comment_id, query, body):
+        for (issue_repo, _), issue in self.issues.items():
+            for comment in issue["comments"]:
+                if issue_repo == repo.lower() and comment["id"] == int(comment_id):
+                    comment["body"] = body["body"]
+                    return 200, comment
+        return 404, {"message": "Not Found"}
+
+    def list_comments(self, repo, number, query, body):
+        issue = self.issues.get((repo.lower(), int(number)))
+        if issue is None:
+            return 404, {"message": "Not Found"}
+        return 200, Page(list(issue["comments"]), query)
+
+    # GraphQL operations, picked by the operation name in the query
+
+    def graphql(self, query, body):
+        text = body.get("query", "")
+        variables = body.get("variables") or {}
+        if "createEnterpriseOrganization" in text:
+            return 200, self.create_org(variables)
+        if "enterpriseOrganizations" in text:
+            return 200, self.enterprise_orgs(variables)
+        if "query enterprise " in text:
+            return 200, {"data": {"enterprise": {"id": "E_simulated"}}}
+        if "query organization " in text:
+            org = self.live_org(variables["login"])
+            if org is None:
+                return 200, {
+                    "data": {"organization": None},
+                    "errors": [{"type": "NOT_FOUND", "message": "Not found"}],
+                }
+            return 200, {
+                "data": {
+                    "organization": {
+                        "id": org["node_id"],
+                        "login": org["login"],
+                        "name": org["login"],
+                        "viewerCanAdminister": True,
+                    }
+                }
+            }
+        if "query users " in text:
+            return 200, self.users(variables)
+        if "query owners " in text:
+            return 200, self.owners(variables)
+        if "recentComments" in text:
+            return 200, self.recent_comments(variables)
+        return 200, {"errors": [{"message": "Unknown operation"}]}
+
+    def create_org(self, variables):
+        login = variables["login"]
+        existing = self.orgs.get(login.lower())
+        if login.lower() in self.taken or (
+            existing is not None and existing["deleted_at"] is None
+        ):
+            return {
+                "data": {"createEnterpriseOrganization": None},
+                "errors": [{"message": f"Login {login} is unavailable"}],
+            }
+        org_id = len(self.orgs) + 1
+        self.orgs[login.lower()] = {
+            "login": login,
+            "id": org_id,
+            "node_id": f"O_{org_id}",
+            "ready_at": time.time() + self.org_delay,
+            "deleted_at": None,
+            "admins": variables["adminLogins"],
+            "invitations": set(),
+        }
+        return {
+            "data": {
+                "createEnterpriseOrganization": {
+                    "organization": {"id": f"O_{org_id}", "name": login}
+                }
+            }
+        }
+
+    def enterprise_orgs(self, variables):
+        logins = [org["login"] for org in self.orgs.values() if self.is_live(org)]
+        start = int(variables.get("cursor") or 0)
+        page = logins[start : start + 100]
+        return {
+            "data": {
+                "enterprise": {
+                    "organizations": {
+                        "pageInfo": {
+                            "hasNextPage": start + 100 < len(logins),
+                            "endCursor": str(start + 100),
+                        },
+                        "nodes": [{"login": login} for login in page],
+                    }
+                }
+            }
+        }
+
+    def users(self, variables):
+        data = {}
+        errors = []
+        for alias, login in variables.items():
+            if login.lower() in self.missing_users:
+                data[alias] = None
+                errors.append({"type": "NOT_FOUND", "path": [alias]})
+            else:
+                data[alias] = {"login": login, "databaseId": user_id(login)}
+        result = {"data": data}
+        if errors:
+            result["errors"] = errors
+        return result
+
+    # Only orgs and taken logins have an owner; any other login is free
+    def owners(self, variables):
+        data = {}
+        for alias, login in variables.items():
+            if login.lower() in self.taken:
+                data[alias] = {"login": login}
+            elif self.known_org(login) is not None:
+                data[alias] = {"login": login, "viewerCanAdminister": True}
+            else:
+                data[alias] = None
+        return {"data": data}
+
+    def recent_comments(self, variables):
+        repo = f"{variables['owner']}/{variables['name']}".lower()
+        issue = self.issues.get((repo, int(variables["number"])))
+        nodes = [
+            {"body": comment["body"], "author": {"login": "github-actions"}}
+            for comment in (issue["comments"] if issue else [])[-variables["count"] :]
+        ]
+        return {"data": {"repository": {"issue": {"comments": {"nodes": nodes}}}}}
+
+    # Helpers
+
+    def is_live(self, org):
+        now = time.time()
+        if org["deleted_at"] is not None and now >= org["deleted_at"]:
+            return False
+        return now >= org["ready_at"]
+
+    # An org accepts writes as soon as it is created, but reads only see it
+    # once it is ready, like GitHub's eventually consistent org lookups
+    def known_org(self, login):
+        org = self.orgs.get((login or "").lower())
+        if org is None or org["deleted_at"] is not None:
+            return None
+        return org
+
+    def live_org(self, login):
+        org = self.orgs.get((login or "").lower())
+        if org is None or not self.is_live(org):
+            return None
+        return org
+
+    def live_repo(self, full_name):
+        repo = self.repos.get(full_name.lower())
+        if repo is None or time.time() < repo["ready_at"]:
+            return None
+        if self.known_org(repo["full_name"].split("/")[0]) is None:
+            return None
+        return repo
+
+
+# A paginated REST result; rendered with a Link header like GitHub's
+class Page:
+    def __init__(self, items, query):
+        self.query = query
+        self.per_page = int(query.get("per_page", 30))
+        self.page = int(query.get("page", 1))
+        self.all_items = items
+        start = (self.page - 1) * self.per_page
+        self.items = items[start : start + self.per_page]
+
+    def link(self, host, path):
+        if self.page * self.per_page >= len(self.all_items):
+            return {}
+        query = dict(self.query, page=self.page + 1)
+        query_string = "&".join(f"{k}={quote(str(v))}" for k, v in query.items())
+        return {"Link": f'<http://{host}{path}?{query_string}>; rel="next"'}
+
+
+ROUTES = [
+    ("POST", r"/graphql", "graphql"),
+    ("GET", r"/_simulator/stats", "snapshot"),
+    ("POST", r"/repos/([^/]+/[^/]+)/forks", "fork"),
+    ("POST", r"/repos/([^/]+/[^/]+)/generate", "generate"),
+    ("GET", r"/repos/([^/]+/[^/]+)/issues", "list_issues"),
+    ("PATCH", r"/repos/([^/]+/[^/]+)/issues/comments/(\d+)", "edit_comment"),
+    ("GET", r"/repos/([^/]+/[^/]+)/issues/(\d+)", "get_issue"),
+    ("PATCH", r"/repos/([^/]+/[^/]+)/issues/(\d+)", "update_issue"),
+    ("POST", r"/repos/([^/]+/[^/]+)/issues/(\d+)/labels", "add_labels"),
+    ("DELETE", r"/repos/([^/]+/[^/]+)/issues/(\d+)/labels/([^/]+)", "remove_label"),
+    ("POST", r"/repos/([^/]+/[^/]+)/issues/(\d+)/comments", "add_comment"),
+    ("GET", r"/repos/([^/]+/[^/]+)/issues/(\d+)/comments", "list_comments"),
+    ("GET", r"/repos/([^/]+/[^/]+)", "get_repo"),
+    ("PATCH", r"/repos/([^/]+/[^/]+)", "update_repo"),
+    ("GET", r"/orgs/([^/]+)", "get_org"),
+    ("DELETE", r"/orgs/([^/]+)", "delete_org"),
+    ("POST", r"/orgs/([^/]+)/invitations", "invite"),
+    ("GET", r"/users/([^/]+)", "get_user"),
+]
+
+
+def route_path(args, route):
+    if route == "list_issues":
+        return f"/repos/{args[0]}/issues"
+    return f"/repos/{args[0]}/issues/{args[1]}/comments"
+
+
+# Stable fake database id for a login
+def user_id(login):
+    return int(hashlib.sha1(login.lower().encode()).hexdigest()[:8], 16)
+
+
+def rest_issue(issue):
+    return {key: value for key, value in issue.items() if key != "comments"}
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    simulator = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def respond(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        body = json.loads(raw) if raw else {}
+        status, payload, headers = self.simulator.handle(
+            self.command, self.path, self.headers, body
+        )
+        data = b"" if payload is None else json.dumps(payload).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PATCH = do_DELETE = do_PUT = respond
+
+
+def main():
+    setup_logging()
+    parser = argparse.ArgumentParser(description="Local GitHub API simulator")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--fork-delay", type=float, default=0.0)
+    parser.add_argument("--org-delay", type=float, default=0.0)
+    parser.add_argument("--delete-delay", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=5000)
+    parser.add_argument("--content-per-minute", type=int, default=None)
+    parser.add_argument("--retry-after", type=int, default=60)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--missing-user", action="append", default=[])
+    parser.add_argument(
+        "--taken", action="append", default=[], help="login someone else owns"
+    )
+    parser.add_argument("--repo", default="github-adv-sec/adv-sec")
+    parser.add_argument("--issue", type=int, help="seed an issue with this number")
+    parser.add_argument("--issue-body", help="file with the issue body to seed")
+    parser.add_argument("--label", action="append", default=["bootcamp::new"])
+    args = parser.parse_args()
+
+    simulator = Simulator(
+        latency=args.latency,
+        fork_delay=args.fork_delay,
+        org_delay=args.org_delay,
+        delete_delay=args.delete_delay,
+        rate_limit=args.rate_limit,
+        content_per_minute=args.content_per_minute,
+        retry_after=args.retry_after,
+        error_rate=args.error_rate,
+        missing_users=args.missing_user,
+        taken=args.taken,
+    )
+    if args.issue is not None:
+        with open(args.issue_body, "r") as stream:
+            simulator.add_issue(args.repo, args.issue, stream.read(), args.label)
+    url = simulator.start(args.port)
+    logging.info(f"Simulator listening on {url}")
+    print(f"GITHUB_API_URL={url} GITHUB_GRAPHQL_URL={url}/graphql")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        simulator.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import logging
+import threading
+import time
+import gh.comments as comments
+import gh.trace as trace
+
+
+# The journal step that marks a planned repo as finished
+def final_step(fork):
+    if fork["strategy"] == "template":
+        return "generated"
+    if fork["private"]:
+        return "visibility_set"
+    return "forked"
+
+
+def status_text(org, repo_count):
+    if org["done"]:
+        if not org["created"]:
+            return "❌ Failed"
+        if org["fork_errors"] or (org["invite"] and not org["invited"]):
+            return "⚠️ Ready with errors"
+        return "✅ Ready"
+    if not org["created"]:
+        return "⏳ Queued"
+    text = f"🍴 Repos {len(org['repos'])}/{repo_count}"
+    if org["invited"]:
+        text += ", invite sent"
+    return text
+
+
+# Keeps one comment on a bootcamp issue up to date while setup runs. Journal
+# entries and finished orgs update the row of that org only; edits are
+# coalesced so the comment is written at most once per interval (seconds)
+# however many updates come in.
+class StatusComment:
+    def __init__(self, issue, plan, interval=30):
+        self.issue = issue
+        self.interval = interval
+        self.lock = threading.Lock()
+        # Serialises the API calls; flushes can come from the timer and close()
+        self.send_lock = threading.Lock()
+        self.final_steps = {fork["repo"]: final_step(fork) for fork in plan["forks"]}
+        self.orgs = {}
+        for org in plan["orgs"]:
+            self.orgs[org["members"][0]["handle"]] = {
+                # One row per org, even for someone who is both attendee and facilitator
+                "handles": list(
+                    dict.fromkeys(member["handle"] for member in org["members"])
+                ),
+                "org_name": org["org_name"],
+                "invite": org["invite"],
+                "created": False,
+                "invited": False,
+                "repos": set(),
+                "done": False,
+                "fork_errors": [],
+            }
+        self.rows = {handle: self.render(handle) for handle in self.orgs}
+        self.ready = 0
+        self.finished = False
+        self.comment_id = None
+        self.dirty = False
+        self.timer = None
+        self.last_flush = 0
+
+    def render(self, handle):
+        org = self.orgs[handle]
+        return comments.status_row(
+            org["handles"],
+            status_text(org, len(self.final_steps)),
+            org["org_name"] if org["created"] else None,
+            org["fork_errors"],
+        )
+
+    # Posts the comment, with the progress of an interrupted run if resuming
+    def start(self, entries=()):
+        for entry in entries:
+            self.record(entry)
+        with self.lock:
+            self.dirty = True
+        self.flush()
+
+    # Journal listener
+    def record(self, entry):
+        handle = entry.get("handle")
+        if handle not in self.orgs:
+            return
+        with self.lock:
+            org = self.orgs[handle]
+            if entry["step"] == "org_created":
+                org["created"] = True
+                org["org_name"] = entry["org_name"]
+            elif entry["step"] == "invited":
+                org["invited"] = True
+            elif self.final_steps.get(entry["repo"]) == entry["step"]:
+                org["repos"].add(entry["repo"])
+            else:
+                return
+            self.rows[handle] = self.render(handle)
+        self.schedule()
+
+    # Marks the org as finished once provision_org's future completes
+    def watch(self, future, org):
+        future.add_done_callback(lambda future: self.finish_org(org))
+
+    def finish_org(self, org):
+        attendee = org["members"][0]
+        with self.lock:
+            state = self.orgs[attendee["handle"]]
+            state.update(
+                {
+                    "created": attendee["org_name"] is not None,
+                    "invited": attendee["invited"],
+                    "fork_errors": list(attendee["fork_errors"]),
+                    "done": True,
+                }
+            )
+            if attendee["org_name"] is not None:
+                state["org_name"] = attendee["org_name"]
+                self.ready += 1
+            self.rows[attendee["handle"]] = self.render(attendee["handle"])
+        self.schedule()
+
+    # Flushes now if the last write was more than an interval ago, otherwise
+    # once the interval is up. Updates in between are written together.
+    def schedule(self):
+        with self.lock:
+            self.dirty = True
+            if self.timer is not None or self.comment_id is None:
+                return
+            delay = max(0, self.last_flush + self.interval - time.time())
+            self.timer = threading.Timer(delay, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    @trace.stage("status")
+    def flush(self):
+        with self.send_lock:
+            with self.lock:
+                self.timer = None
+                if not self.dirty:
+                    return
+                self.dirty = False
+                body = comments.status_to_markdown(
+                    self.rows.values(), self.ready, len(self.orgs), self.finished
+                )
+                self.last_flush = time.time()
+            # Status updates are best effort and never fail the run
+            try:
+                if self.comment_id is None:
+                    self.comment_id = self.issue.add_comment(body)
+                else:
+                    self.issue.edit_comment(self.comment_id, body)
+            except Exception as e:
+                logging.warning(f"Could not update the status comment: {e}")
+
+    # Writes the final state straight away
+    def close(self):
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            self.finished = True
+            self.dirty = True
+        self.flush()
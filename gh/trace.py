@@ -0,0 +1,214 @@
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+# Per-request tracing for the clients. A client calls its hooks once per
+# request (after any retries) with an event dict; Tracer is the hook that
+# writes the events to a JSONL file and summarises them at the end of a run.
+
+# Name of the stage (create_org, fork, invite, ...) the current thread or
+# task is working on; set with stage()
+current_stage = contextvars.ContextVar("stage", default="main")
+
+# Response codes the current request is expected to get, e.g. 404 while
+# polling for something that doesn't exist yet; set with expect()
+expected_statuses = contextvars.ContextVar("expected_statuses", default=())
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+# REST paths with their ids replaced, so events group by endpoint
+TEMPLATES = [
+    (
+        r"/repos/[^/]+/[^/]+/issues/comments/\d+",
+        "/repos/{owner}/{repo}/issues/comments/{id}",
+    ),
+    (
+        r"/repos/[^/]+/[^/]+/issues/\d+/labels/[^/]+",
+        "/repos/{owner}/{repo}/issues/{number}/labels/{name}",
+    ),
+    (
+        r"/repos/[^/]+/[^/]+/issues/\d+/(\w+)",
+        r"/repos/{owner}/{repo}/issues/{number}/\1",
+    ),
+    (r"/repos/[^/]+/[^/]+/issues/\d+", "/repos/{owner}/{repo}/issues/{number}"),
+    (r"/repos/[^/]+/[^/]+/(\w+)", r"/repos/{owner}/{repo}/\1"),
+    (r"/repos/[^/]+/[^/]+", "/repos/{owner}/{repo}"),
+    (r"/orgs/[^/]+/(\w+)", r"/orgs/{org}/\1"),
+    (r"/orgs/[^/]+", "/orgs/{org}"),
+    (r"/users/[^/]+", "/users/{username}"),
+]
+
+
+# Marks the requests made inside it as belonging to a stage. Works as a
+# context manager or as a decorator.
+@contextlib.contextmanager
+def stage(name):
+    token = current_stage.set(name)
+    try:
+        yield
+    finally:
+        current_stage.reset(token)
+
+
+# Marks the given response codes as expected for the requests made inside
+# it, so the summary doesn't count them as errors
+@contextlib.contextmanager
+def expect(*statuses):
+    token = expected_statuses.set(statuses)
+    try:
+        yield
+    finally:
+        expected_statuses.reset(token)
+
+
+# Endpoint template for a request, e.g. "/orgs/{org}/invitations" or
+# "graphql createEnterpriseOrganization"
+def endpoint(url, query=None):
+    if query is not None:
+        match = re.match(r"\s*(?:query|mutation)\s+(\w+)", query)
+        return f"graphql {match.group(1) if match else 'anonymous'}"
+    path = urlparse(url).path.rstrip("/")
+    for pattern, template in TEMPLATES:
+        match = re.search(pattern + "$", path)
+        if match:
+            return match.expand(template)
+    return path
+
+
+# The event a client passes to its hooks. Works with requests and httpx responses.
+def event(client, method, url, kwargs, start, waited, attempt, response, error=None):
+    query = None
+    if url == client.graphql_url:
+        query = (kwargs.get("json") or {}).get("query", "")
+    headers = response.headers if response is not None else {}
+    status = response.status_code if response is not None else None
+    remaining = headers.get("X-RateLimit-Remaining")
+    return {
+        "time": start,
+        "method": method,
+        "endpoint": endpoint(url, query),
+        "status": status,
+        "expected": status in expected_statuses.get(),
+        "error": str(error) if error is not None else None,
+        "latency": round(time.time() - start, 4),
+        "wait": round(waited, 4),
+        "attempts": attempt + 1,
+        "remaining": int(remaining) if remaining is not None else None,
+        "resource": headers.get("X-RateLimit-Resource"),
+    }
+
+
+def request_name(event):
+    return f"{event['method']} {event['endpoint']}"
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+class Tracer:
+    def __init__(self, path=None):
+        self.lock = threading.Lock()
+        self.events = []
+        self.stream = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.stream = open(path, "w")
+            logging.info(f"Tracing requests to {path}")
+
+    # Client hook: called with one event per request
+    def __call__(self, event):
+        event["stage"] = current_stage.get()
+        with self.lock:
+            self.events.append(event)
+            if self.stream is not None:
+                self.stream.write(json.dumps(event) + "\n")
+
+    # Markdown summary with per-stage latency histograms and the slowest endpoints
+    def summary(self):
+        with self.lock:
+            events = list(self.events)
+        if not events:
+            return "### API requests\n\nNo requests were made.\n"
+
+        retries = sum(event["attempts"] - 1 for event in events)
+        rate_limited = sum(1 for event in events if event["status"] in (403, 429))
+        headroom = [
+            event["remaining"] for event in events if event["remaining"] is not None
+        ]
+        lines = [
+            "### API requests",
+            "",
+            f"{len(events)} requests, {retries} retries, {rate_limited} rejected by rate limits"
+            + (f", lowest rate limit headroom {min(headroom)}" if headroom else ""),
+            "",
+            "| Stage | Requests | p50 | p95 | max | "
+            + " | ".join(f"≤{bucket}s" for bucket in BUCKETS)
+            + f" | >{BUCKETS[-1]}s |",
+            "| --- " * (len(BUCKETS) + 6) + "|",
+        ]
+        for name, latencies in self.group(events, lambda event: event["stage"]):
+            counts = [0] * (len(BUCKETS) + 1)
+            for latency in latencies:
+                counts[
+                    next(
+                        (i for i, bucket in enumerate(BUCKETS) if latency <= bucket),
+                        len(BUCKETS),
+                    )
+                ] += 1
+            lines.append(
+                f"| {name} | {len(latencies)} | {percentile(latencies, 0.5):.2f}s "
+                f"| {percentile(latencies, 0.95):.2f}s | {max(latencies):.2f}s | "
+                + " | ".join(str(count) for count in counts)
+                + " |"
+            )
+
+        lines += [
+            "",
+            "| Endpoint | Requests | Total | p50 | p95 | Errors |",
+            "| --- | --- | --- | --- | --- | --- |",
+        ]
+        errors = {}
+        for event in events:
+            if event["expected"]:
+                continue
+            if event["status"] is None or event["status"] >= 400:
+                errors[request_name(event)] = errors.get(request_name(event), 0) + 1
+        by_total = sorted(
+            self.group(events, request_name), key=lambda group: -sum(group[1])
+        )
+        for name, latencies in by_total[:15]:
+            lines.append(
+                f"| `{name}` | {len(latencies)} | {sum(latencies):.1f}s "
+                f"| {percentile(latencies, 0.5):.2f}s | {percentile(latencies, 0.95):.2f}s "
+                f"| {errors.get(name, 0)} |"
+            )
+        return "\n".join(lines) + "\n"
+
+    # Latencies grouped by key(event), sorted by key
+    def group(self, events, key):
+        groups = {}
+        for event in events:
+            groups.setdefault(key(event), []).append(event["latency"])
+        return sorted(groups.items())
+
+    # Closes the trace and appends the summary to the Actions job summary
+    def finish(self):
+        with self.lock:
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+        summary_path = os.environ.get("GITHUB_STEP_SUMMARY")
+        if summary_path:
+            with open(summary_path, "a") as stream:
+                stream.write(self.summary())
+        else:
+            logging.info(self.summary())
@@ -0,0 +1,145 @@
+import datetime
+import re
+
+# Checks a bootcamp request and the config before anything is created, so
+# every problem can be reported at once instead of failing part way through.
+# Each check returns a list of problems, as sentences for the issue comment.
+
+# GitHub logins (users and orgs): letters, digits and single hyphens, not at
+# the start or end, at most 39 characters
+LOGIN_PATTERN = re.compile(r"^[a-z0-9](?:-?[a-z0-9])*$", re.IGNORECASE)
+LOGIN_LENGTH = 39
+
+# What an issue form puts under a heading that was left empty
+NO_RESPONSE = "_No response_"
+
+# Setup config keys and the types they must have
+SETUP_CONFIG = {
+    "enterprise": str,
+    "org-prefix": str,
+    "billing-admin": str,
+    "max-workers": int,
+    "readiness-timeout": int,
+    "cache-path": str,
+    "cache-ttl": int,
+    "index-path": str,
+    "state-path": str,
+    "status-interval": int,
+    "labels": dict,
+    "repos-to-fork": list,
+}
+SETUP_LABELS = ["working", "done", "error", "new", "batch"]
+TYPE_NAMES = {str: "a string", int: "a number", dict: "a mapping", list: "a list"}
+
+# How a repos-to-fork entry is copied into each org
+REPO_STRATEGIES = ("fork", "template")
+
+
+def valid_login(login):
+    return len(login) <= LOGIN_LENGTH and LOGIN_PATTERN.match(login) is not None
+
+
+# Sections of an issue form body, keyed by heading. A section is everything up
+# to the next heading, so answers spread over several lines are kept whole.
+def parse_form(body):
+    sections = {}
+    heading = None
+    for line in (body or "").replace("\r\n", "\n").split("\n"):
+        match = re.match(r"^###\s+(.+?)\s*$", line)
+        if match:
+            heading = match.group(1)
+            sections[heading] = []
+        elif heading is not None:
+            sections[heading].append(line)
+    fields = {}
+    for heading, lines in sections.items():
+        value = "\n".join(lines).strip()
+        fields[heading] = "" if value == NO_RESPONSE else value
+    return fields
+
+
+# Handles from a form answer, split on commas and whitespace. A leading @ is
+# dropped and repeats (in any case) are removed, keeping the first spelling.
+def parse_handles(text):
+    handles = {}
+    for handle in re.split(r"[,\s]+", text or ""):
+        handle = handle.strip().lstrip("@")
+        if handle:
+            handles.setdefault(handle.lower(), handle)
+    return list(handles.values())
+
+
+def check_date(bootcamp_date):
+    if not bootcamp_date:
+        return ["Bootcamp date cannot be empty"]
+    try:
+        if not re.match(r"^\d{4}-\d{2}-\d{2}$", bootcamp_date):
+            raise ValueError
+        datetime.date.fromisoformat(bootcamp_date)
+    except ValueError:
+        return [
+            f"Bootcamp date `{bootcamp_date}` is not a date in the format YYYY-MM-DD"
+        ]
+    return []
+
+
+def check_handles(handles, field):
+    if not handles:
+        return [f"{field} cannot be empty"]
+    return [
+        f"`{handle}` in {field} is not a valid GitHub handle"
+        for handle in handles
+        if not valid_login(handle)
+    ]
+
+
+def check_setup_config(config):
+    problems = []
+    # The other checks only look at keys with the right type
+    valid = set()
+    for key, kind in SETUP_CONFIG.items():
+        if key not in config:
+            problems.append(f"Config is missing {key}")
+        elif not isinstance(config[key], kind) or isinstance(config[key], bool):
+            problems.append(f"Config {key} must be {TYPE_NAMES[kind]}")
+        else:
+            valid.add(key)
+
+    for key in ["max-workers", "readiness-timeout", "status-interval"]:
+        if key in valid and config[key] < 1:
+            problems.append(f"Config {key} must be at least 1")
+    if "org-prefix" in valid and not valid_login(config["org-prefix"]):
+        problems.append(
+            f"Config org-prefix `{config['org-prefix']}` is not a valid org name"
+        )
+    if "billing-admin" in valid and not valid_login(config["billing-admin"]):
+        problems.append(
+            f"Config billing-admin `{config['billing-admin']}` is not a valid GitHub handle"
+        )
+    if "labels" in valid:
+        for label in SETUP_LABELS:
+            if not config["labels"].get(label):
+                problems.append(f"Config labels is missing {label}")
+    if "repos-to-fork" not in valid:
+        return problems
+
+    if not config["repos-to-fork"]:
+        problems.append("Config repos-to-fork cannot be empty")
+    names = {}
+    for entry in config["repos-to-fork"]:
+        if isinstance(entry, str):
+            entry = {"repo": entry}
+        if not isinstance(entry, dict) or not isinstance(entry.get("repo"), str):
+            problems.append(f"Config repos-to-fork entry {entry} has no repo")
+            continue
+        repo = entry["repo"]
+        if not re.match(r"^[\w.-]+/[\w.-]+$", repo):
+            problems.append(f"Config repos-to-fork entry `{repo}` is not owner/name")
+            continue
+        if entry.get("strategy", "fork") not in REPO_STRATEGIES:
+            problems.append(f"Unknown strategy for {repo}: {entry['strategy']}")
+        # Repos keep their name in every org, so two owners can't share one
+        name = repo.split("/")[1].lower()
+        if names.setdefault(name, repo) != repo:
+            problems.append(f"Config repos-to-fork has two repos named {name}")
+    return problems